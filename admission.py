@@ -0,0 +1,163 @@
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+from metrics import Histogram, gauge_lines
+
+# --- Render Admission Control ---
+# PDF rendering is CPU bound, so running more renders than there are cores
+# only makes every request (logins included) slower. Renders take one of
+# max_concurrent slots; requests that find no free slot wait in a bounded
+# queue for at most max_wait seconds and are otherwise rejected, so the caller
+# can answer 503 with a Retry-After estimate. Waiters are admitted round-robin
+# across users, and no user holds more than max_per_user slots at once, so one
+# user's burst cannot starve everyone else. Limits are per process.
+
+QUEUE_FULL = 'queue_full'
+TIMEOUT = 'timeout'
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason, retry_after):
+        super().__init__(f"Rendering is at capacity ({reason.replace('_', ' ')}); retry in {retry_after}s.")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ('user', 'event', 'admitted')
+
+    def __init__(self, user):
+        self.user = user
+        self.event = threading.Event()
+        self.admitted = False
+
+
+class AdmissionController:
+    def __init__(self, max_concurrent, max_queue=None, max_wait=10.0, max_per_user=None):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_concurrent * 4 if max_queue is None else max_queue
+        self.max_wait = max_wait
+        self.max_per_user = max_per_user or max_concurrent
+        self._lock = threading.Lock()
+        self._running = 0
+        self._running_by_user = {}
+        self._waiting = OrderedDict() # user -> deque of _Waiter, in round-robin order
+        self._waiting_count = 0
+        self._avg_hold = 1.0 # Moving average of seconds a slot is held, for Retry-After
+        self.admitted = 0
+        self.rejections = {QUEUE_FULL: 0, TIMEOUT: 0}
+        self.wait_seconds = Histogram('report_admission_wait_seconds',
+                                      'Time report renders waited for a render slot.', ('outcome',))
+
+    def _has_room(self, user):
+        return (self._running < self.max_concurrent
+                and self._running_by_user.get(user, 0) < self.max_per_user)
+
+    def _admit(self, user):
+        self._running += 1
+        self._running_by_user[user] = self._running_by_user.get(user, 0) + 1
+        self.admitted += 1
+
+    def _dispatch(self):
+        # Hand free slots to waiting users in turn; a user who got one moves to the back
+        while self._waiting and self._running < self.max_concurrent:
+            for user in self._waiting:
+                if self._has_room(user):
+                    break
+            else:
+                return # Everyone waiting is at their per-user limit
+            waiters = self._waiting[user]
+            waiter = waiters.popleft()
+            self._waiting_count -= 1
+            if waiters:
+                self._waiting.move_to_end(user)
+            else:
+                del self._waiting[user]
+            self._admit(user)
+            waiter.admitted = True
+            waiter.event.set()
+
+    def retry_after(self):
+        """Seconds until a new request could expect a slot, rounded up."""
+        backlog = self._waiting_count + 1
+        return max(1, math.ceil(self._avg_hold * backlog / self.max_concurrent))
+
+    def acquire(self, user):
+        """Take a render slot for user, waiting up to max_wait. Raises AdmissionRejected."""
+        start = time.perf_counter()
+        with self._lock:
+            if self._has_room(user):
+                self._admit(user)
+                self.wait_seconds.observe(0.0, 'admitted')
+                return
+            if self._waiting_count >= self.max_queue:
+                self.rejections[QUEUE_FULL] += 1
+                raise AdmissionRejected(QUEUE_FULL, self.retry_after())
+            waiter = _Waiter(user)
+            self._waiting.setdefault(user, deque()).append(waiter)
+            self._waiting_count += 1
+
+        waiter.event.wait(self.max_wait)
+        waited = time.perf_counter() - start
+        with self._lock:
+            if waiter.admitted: # Also covers a slot granted just as the wait timed out
+                self.wait_seconds.observe(waited, 'admitted')
+                return
+            waiters = self._waiting[user]
+            waiters.remove(waiter)
+            if not waiters:
+                del self._waiting[user]
+            self._waiting_count -= 1
+            self.rejections[TIMEOUT] += 1
+            self.wait_seconds.observe(waited, 'rejected')
+            raise AdmissionRejected(TIMEOUT, self.retry_after())
+
+    def try_acquire(self, user):
+        """Take a render slot for user only if one is free and no one is waiting. Never blocks."""
+        with self._lock:
+            if self._waiting_count or not self._has_room(user):
+                return False
+            self._admit(user)
+            return True
+
+    def release(self, user, held_seconds=None):
+        with self._lock:
+            self._running -= 1
+            count = self._running_by_user[user] - 1
+            if count:
+                self._running_by_user[user] = count
+            else:
+                del self._running_by_user[user]
+            if held_seconds is not None:
+                self._avg_hold = 0.8 * self._avg_hold + 0.2 * held_seconds
+            self._dispatch()
+
+    @contextmanager
+    def slot(self, user):
+        self.acquire(user)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(user, time.perf_counter() - start)
+
+    def stats(self):
+        with self._lock:
+            return {'running': self._running, 'waiting': self._waiting_count,
+                    'max_concurrent': self.max_concurrent, 'max_queue': self.max_queue,
+                    'admitted': self.admitted, 'rejected_queue_full': self.rejections[QUEUE_FULL],
+                    'rejected_timeout': self.rejections[TIMEOUT]}
+
+    def prometheus_lines(self):
+        stats = self.stats()
+        lines = gauge_lines('report_admission_running', 'Report renders holding a slot.', stats['running'])
+        lines += gauge_lines('report_admission_queue_depth', 'Report renders waiting for a slot.', stats['waiting'])
+        lines += gauge_lines('report_admission_admitted_total', 'Report renders admitted.', stats['admitted'], 'counter')
+        lines += ['# HELP report_admission_rejected_total Report renders rejected with 503.',
+                  '# TYPE report_admission_rejected_total counter']
+        lines += [f'report_admission_rejected_total{{reason="{reason}"}} {stats["rejected_" + reason]}'
+                  for reason in (QUEUE_FULL, TIMEOUT)]
+        return lines + self.wait_seconds.render()
@@ -1,277 +1,86 @@
-from flask import Flask, render_template, request, send_file, redirect, url_for, flash
+from flask import Flask, Blueprint, current_app, has_app_context, render_template, request, send_file, redirect, url_for, flash, jsonify, Response, stream_with_context, abort
+from werkzeug.exceptions import RequestEntityTooLarge
 from datetime import datetime
 import os
 import io
+import gc
 
 # Import security components
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user, UserMixin
 from flask_bcrypt import Bcrypt # For password hashing
 from models import db, User # Import db and User from models.py
 from forms import RegistrationForm, LoginForm # Import forms
 from config import Config # Import configuration
 
-# Import reportlab components (your existing PDF logic)
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak, Image, Table, TableStyle
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.lib import colors
-from reportlab.lib.enums import TA_LEFT, TA_CENTER, TA_RIGHT
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.platypus.flowables import KeepTogether
-from reportlab.lib.styles import ParagraphStyle
-
-app = Flask(__name__)
-app.config.from_object(Config) # Load config from Config class
-
-# Initialize extensions
-db.init_app(app)
-bcrypt = Bcrypt(app)
-login_manager = LoginManager(app)
-login_manager.login_view = 'login' # Where to redirect if login_required is used and user isn't logged in
+from pdf_cache import PDFCache, report_cache_key # Rendered-PDF cache
+from report import (generate_inspection_report_pdf, build_form_data, render_config_version,
+                    open_spooled_output, spooled_pdf_body, default_report_data, RENDER_PROFILES, photo_store,
+                    COMPANY_LOGO_PATH, CUSTOM_FONT_PATH, FONT_NAME_NORMAL, FONT_NAME_BOLD) # PDF rendering
+from styles import get_report_styles
+from batch import BatchInputError, parse_batch_upload, stream_batch_zip, get_executor # Batch reports
+from jobs import JobQueue, QueueFullError, DONE # Asynchronous report jobs
+from metrics import registry as metrics, gauge_lines # Report timing metrics
+from layout_cache import layout_cache_stats
+from user_cache import UserCache # Session user cache
+from archive import ReportArchive # Archive of rendered reports
+from admission import AdmissionController, AdmissionRejected # Render concurrency limits
+from photos import PhotoError, parse_photo_ids # Inspection photo uploads
+from multipart_form import parse_multipart_form # Report form parsing that keeps the user's input
+from contextlib import nullcontext
+
+# Extensions are bound to the app in create_app()
+bcrypt = Bcrypt()
+login_manager = LoginManager()
+login_manager.login_view = 'main.login' # Where to redirect if login_required is used and user isn't logged in
 login_manager.login_message_category = 'info' # Category for flash message
 
+main = Blueprint('main', __name__)
+
+# Per-app services, created by create_app() and kept on app.extensions so
+# several apps (tests, tools) in one process do not share them
+class ReportServices:
+    def __init__(self, pdf_cache, user_cache, render_admission=None, report_archive=None, job_queue=None):
+        self.pdf_cache = pdf_cache
+        self.user_cache = user_cache
+        self.render_admission = render_admission # None when renders are not limited
+        self.report_archive = report_archive # None unless REPORT_ARCHIVE_ENABLED
+        self.job_queue = job_queue # None unless REPORT_ASYNC_ENABLED
+
+def _services():
+    return current_app.extensions['report_services']
+
+# Archive listing page size
+HISTORY_PAGE_SIZE = 50
+
 # --- Flask-Login user loader ---
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
-
-# --- Configuration for PDF generation (still separate) ---
-COMPANY_NAME = "Professional Inspection Services Inc."
-COMPANY_LOGO_PATH = "company_logo.png"
-CUSTOM_FONT_PATH = "Roboto-Regular.ttf"
-FONT_NAME_NORMAL = "Helvetica"
-FONT_NAME_BOLD = "Helvetica-Bold"
-FONT_NAME_CUSTOM = "Roboto"
-
-# --- Register custom font if available ---
-try:
-    if os.path.exists(CUSTOM_FONT_PATH):
-        pdfmetrics.registerFont(TTFont(FONT_NAME_CUSTOM, CUSTOM_FONT_PATH))
-        FONT_NAME_NORMAL = FONT_NAME_CUSTOM
-        print(f"Custom font '{CUSTOM_FONT_PATH}' registered successfully.")
-    else:
-        print(f"Warning: Custom font file '{CUSTOM_FONT_PATH}' not found. Using default fonts.")
-except Exception as e:
-    print(f"Error registering custom font: {e}. Using default fonts.")
-
-# --- Page Template Handler for Headers/Footers/Page Numbers ---
-def _header_footer(canvas, doc):
-    canvas.saveState()
-    styles = getSampleStyleSheet()
-    header_style = ParagraphStyle(
-        'Header',
-        parent=styles['Normal'],
-        fontName=FONT_NAME_NORMAL,
-        fontSize=9,
-        textColor=colors.HexColor('#666666'),
-        alignment=TA_RIGHT,
-        spaceAfter=0
-    )
-    footer_style = ParagraphStyle(
-        'Footer',
-        parent=styles['Normal'],
-        fontName=FONT_NAME_NORMAL,
-        fontSize=9,
-        textColor=colors.HexColor('#666666'),
-        alignment=TA_CENTER,
-        spaceBefore=0
-    )
-
-    # Header
-    canvas.setFont(FONT_NAME_NORMAL, 9)
-    canvas.setFillColor(colors.HexColor('#333333'))
-    canvas.drawString(inch, letter[1] - 0.75 * inch, f"{COMPANY_NAME} - Inspection Report")
-    canvas.drawString(letter[0] - 2 * inch, letter[1] - 0.75 * inch, doc.title)
-
-    # Footer
-    canvas.drawString(letter[0] / 2, 0.75 * inch, f"Page {doc.page}")
-    canvas.restoreState()
-
-
-# --- PDF Generation Function (same as previous revision) ---
-def generate_inspection_report_pdf(data):
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter)
-
-    doc.title = f"Claim #{data.get('claim_number', 'N/A')}"
-
-    styles = getSampleStyleSheet()
-
-    # Define styles
-    style_title = ParagraphStyle(
-        'ReportTitle',
-        parent=styles['h1'],
-        fontName=FONT_NAME_BOLD,
-        fontSize=24,
-        textColor=colors.HexColor('#0056b3'),
-        alignment=TA_CENTER,
-        spaceAfter=0.3 * inch
-    )
-    style_section_heading = ParagraphStyle(
-        'SectionHeading',
-        parent=styles['h2'],
-        fontName=FONT_NAME_BOLD,
-        fontSize=16,
-        textColor=colors.HexColor('#004085'),
-        alignment=TA_LEFT,
-        spaceBefore=0.2 * inch,
-        spaceAfter=0.1 * inch,
-    )
-    style_label = ParagraphStyle(
-        'Label',
-        parent=styles['Normal'],
-        fontName=FONT_NAME_BOLD,
-        fontSize=10,
-        textColor=colors.black,
-        spaceAfter=0.05 * inch
-    )
-    style_body = ParagraphStyle(
-        'BodyText',
-        parent=styles['Normal'],
-        fontName=FONT_NAME_NORMAL,
-        fontSize=10,
-        textColor=colors.black,
-        alignment=TA_LEFT,
-        leading=12
-    )
-    style_disclaimer = ParagraphStyle(
-        'DisclaimerText',
-        parent=styles['Normal'],
-        fontName=FONT_NAME_NORMAL,
-        fontSize=8,
-        textColor=colors.HexColor('#555555'),
-        alignment=TA_CENTER,
-        spaceBefore=0.2 * inch
-    )
-    story = []
-
-    # --- Company Logo (if exists) ---
-    if os.path.exists(COMPANY_LOGO_PATH):
-        try:
-            logo = Image(COMPANY_LOGO_PATH, width=2.0 * inch, height=1.0 * inch)
-            logo.hAlign = 'CENTER' # <--- Logo Centered
-            story.append(logo)
-            story.append(Spacer(1, 0.1 * inch))
-        except Exception as e:
-            story.append(Paragraph(f"<i>Error loading logo: {e}</i>", style_body))
-            print(f"Error loading company logo: {e}")
-
-    # --- Report Title ---
-    story.append(Paragraph(data.get('report_title', 'Inspection Report'), style_title))
-    story.append(Spacer(1, 0.2 * inch))
-
-    # --- Inspection Details Table ---
-    details_data = [
-        [Paragraph(f"<b>Inspector:</b>", style_label), Paragraph(data.get('inspector_name', ''), style_body)],
-        [Paragraph(f"<b>Inspector Address:</b>", style_label), Paragraph(data.get('inspector_address', ''), style_body)],
-        [Paragraph(f"<b>Adjuster Name:</b>", style_label), Paragraph(data.get('adjuster_name', ''), style_body)],
-        [Paragraph(f"<b>Adjuster Number:</b>", style_label), Paragraph(data.get('adjuster_number', ''), style_body)],
-        [Paragraph(f"<b>Adjuster Email:</b>", style_label), Paragraph(data.get('adjuster_email', ''), style_body)],
-        [Paragraph(f"<b>Report Date:</b>", style_label), Paragraph(data.get('report_date', ''), style_body)],
-        [Paragraph(f"<b>Claim Number:</b>", style_label), Paragraph(data.get('claim_number', ''), style_body)],
-        [Paragraph(f"<b>Year Built:</b>", style_label), Paragraph(data.get('year_built', ''), style_body)],
-    ]
-    details_table = Table(details_data, colWidths=[1.7 * inch, 4.3 * inch])
-    details_table.setStyle(TableStyle([
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('LEFTPADDING', (0, 0), (-1, -1), 0),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 0),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
-    ]))
-    story.append(KeepTogether(details_table))
-    story.append(Spacer(1, 0.2 * inch))
-
-    # --- Cause of Loss ---
-    story.append(Paragraph(data.get('cause_of_loss_heading', 'Cause of Loss'), style_section_heading))
-    story.append(Paragraph(data.get('cause_of_loss', ''), style_body))
-    story.append(Spacer(1, 0.2 * inch))
-
-    # --- Resulting Damages ---
-    story.append(Paragraph(data.get('resulting_damages_heading', 'Resulting Damages'), style_section_heading))
-    story.append(Paragraph(data.get('resulting_damages', ''), style_body))
-    story.append(Spacer(1, 0.2 * inch))
-
-    # --- Scope of Work ---
-    story.append(Paragraph(data.get('scope_of_work_heading', 'Scope of Work'), style_section_heading))
-    for line in data.get('scope_of_work', '').split('\n'):
-        if line.strip():
-            story.append(Paragraph(line.strip(), style_body))
-    story.append(Spacer(1, 0.2 * inch))
-
-    # --- Recommendations ---
-    story.append(Paragraph(data.get('recommendations_heading', 'Recommendations'), style_section_heading))
-    for line in data.get('recommendations', '').split('\n'):
-        if line.strip():
-            story.append(Paragraph(line.strip(), style_body))
-    story.append(Spacer(1, 0.2 * inch))
-
-    # --- Reserves ---
-    story.append(Paragraph(data.get('reserves_heading', 'Estimated Reserves'), style_section_heading))
-    reserve_data = [['Category', 'Amount']]
-    total_reserves = 0.0
-
-    reserves_input_text = data.get('reserves_input', '').strip()
-    if reserves_input_text:
-        for line in reserves_input_text.split('\n'):
-            if ':' in line:
-                try:
-                    category, amount_str = line.split(':', 1)
-                    amount = float(amount_str.strip().replace('$', '').replace(',', ''))
-                    reserve_data.append([category.strip(), f"${amount:,.2f}"])
-                    total_reserves += amount
-                except ValueError:
-                    reserve_data.append([category.strip(), "Invalid Amount (N/A)"])
-            else:
-                reserve_data.append([line.strip(), "N/A"])
-
-    reserve_data.append(['<b>Total Estimated Reserves</b>', f"<b>${total_reserves:,.2f}</b>"])
-
-    reserve_table = Table(reserve_data, colWidths=[3.5 * inch, 2.0 * inch])
-    reserve_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#E0E0E0')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
-        ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-        ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
-        ('FONTNAME', (0, 0), (-1, 0), FONT_NAME_BOLD),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-        ('TOPPADDING', (0, 0), (-1, 0), 8),
-        ('BACKGROUND', (0, 1), (-1, -2), colors.white),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#CCCCCC')),
-        ('FONTNAME', (0, -1), (-1, -1), FONT_NAME_BOLD),
-        ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#F0F0F0')),
-        ('BOTTOMPADDING', (0, -1), (-1, -1), 8),
-        ('TOPPADDING', (0, -1), (-1, -1), 8),
-    ]))
-    story.append(reserve_table)
-    story.append(Spacer(1, 0.5 * inch))
-
-    # --- Disclaimer ---
-    story.append(PageBreak())
-    story.append(Paragraph(data.get('disclaimer_heading', 'Disclaimer'), style_section_heading))
-    story.append(Paragraph(data.get('disclaimer', ''), style_disclaimer))
-    story.append(Spacer(1, 0.5 * inch))
-
-    doc.build(story, onFirstPage=_header_footer, onLaterPages=_header_footer)
-    buffer.seek(0)
-    return buffer
+    return _services().user_cache.load(int(user_id), lambda uid: User.query.get(uid))
+
+# Any change to an account drops its cached copy (a concurrent request may
+# re-cache the old row before the commit, but only until the TTL expires)
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _invalidate_cached_user(mapper, connection, target):
+    services = current_app.extensions.get('report_services') if has_app_context() else None
+    if services is not None:
+        services.user_cache.invalidate(target.id)
 
 # --- Flask Routes ---
 
 # Home route - accessible to all
-@app.route('/')
-@app.route('/home')
+@main.route('/')
+@main.route('/home')
 def home():
     return render_template('home.html', title='Home') # New simple home page
 
 # Registration route
-@app.route('/register', methods=['GET', 'POST'])
+@main.route('/register', methods=['GET', 'POST'])
 def register():
     if current_user.is_authenticated:
-        return redirect(url_for('generate_report_form')) # If logged in, go to form
+        return redirect(url_for('main.generate_report_form')) # If logged in, go to form
     form = RegistrationForm()
     if form.validate_on_submit():
         hashed_password = bcrypt.generate_password_hash(form.password.data).decode('utf-8')
@@ -279,117 +88,346 @@ def register():
         db.session.add(user)
         db.session.commit()
         flash('Your account has been created! You are now able to log in', 'success')
-        return redirect(url_for('login'))
+        return redirect(url_for('main.login'))
     return render_template('register.html', title='Register', form=form)
 
 # Login route
-@app.route('/login', methods=['GET', 'POST'])
+@main.route('/login', methods=['GET', 'POST'])
 def login():
     if current_user.is_authenticated:
-        return redirect(url_for('generate_report_form'))
+        return redirect(url_for('main.generate_report_form'))
     form = LoginForm()
     if form.validate_on_submit():
         user = User.query.filter_by(email=form.email.data).first()
         if user and bcrypt.check_password_hash(user.password_hash, form.password.data):
             login_user(user, remember=form.remember.data)
             next_page = request.args.get('next')
-            return redirect(next_page) if next_page else redirect(url_for('generate_report_form'))
+            return redirect(next_page) if next_page else redirect(url_for('main.generate_report_form'))
         else:
             flash('Login Unsuccessful. Please check email and password', 'danger')
     return render_template('login.html', title='Login', form=form)
 
 # Logout route
-@app.route('/logout')
+@main.route('/logout')
 @login_required # Requires login to log out
 def logout():
+    _services().user_cache.invalidate(current_user.id)
     logout_user()
-    return redirect(url_for('home'))
+    return redirect(url_for('main.home'))
+
+def _archive_owner():
+    # (user id, username) recorded with archived reports
+    if not current_user.is_authenticated: # LOGIN_DISABLED
+        return None, None
+    return current_user.id, current_user.username
+
+def _archive_report(source, form_data, timer):
+    # Archiving problems must not cost the user their download
+    services = _services()
+    if services.report_archive is None:
+        return
+    try:
+        with timer.phase('archive'):
+            services.report_archive.store(source, form_data, *_archive_owner())
+    except Exception as e:
+        print(f"Error archiving report: {e}")
+
+def _admission_user():
+    # Fairness key for render admission
+    if current_user.is_authenticated:
+        return f"user:{current_user.id}"
+    return f"ip:{request.remote_addr}"
+
+def _render_slot():
+    # Holds a render slot for the duration of a render; raises AdmissionRejected
+    services = _services()
+    if services.render_admission is None:
+        return nullcontext()
+    return services.render_admission.slot(_admission_user())
+
+def _read_report_form():
+    # Returns (form, files, problems). The browser form is multipart because of
+    # the photos and is parsed so that no size limit costs the user their input
+    # (see multipart_form.py); urlencoded posts from API clients carry no uploads
+    config = current_app.config
+    boundary = request.mimetype_params.get('boundary')
+    if request.mimetype != 'multipart/form-data' or not boundary:
+        request.max_content_length = config['REPORT_FORM_MAX_TEXT_BYTES']
+        return request.form, request.files, []
+    return parse_multipart_form(request.stream, boundary.encode('latin1'), config['REPORT_FORM_MAX_TEXT_BYTES'],
+                                config['PHOTO_MAX_BYTES'], config['PHOTO_MAX_TOTAL_BYTES'], request.max_form_parts)
+
+def _attach_photos(form_data, files):
+    # Queues the uploaded photos for processing (see photos.py) and adds their ids
+    # to form_data['photos']. Returns an error message if an upload is rejected.
+    # Size limits were already applied while parsing the form.
+    config = current_app.config
+    uploads = [upload for upload in files.getlist('photo_files') if upload and upload.filename]
+    photo_ids = parse_photo_ids(form_data['photos'])
+    if len(photo_ids) + len(uploads) > config['PHOTO_MAX_COUNT']:
+        return f"A report can have at most {config['PHOTO_MAX_COUNT']} photos."
+    for upload in uploads:
+        try:
+            photo_id = photo_store.submit(upload.stream) # Streamed to disk, never read into memory
+        except PhotoError as e:
+            return f"Photo '{upload.filename}': {e}."
+        if photo_id not in photo_ids:
+            photo_ids.append(photo_id)
+    form_data['photos'] = '\n'.join(photo_ids)
+    return None
+
+def _report_response(form_data, timer):
+    # POST half of generate_report_form; each phase is recorded on timer
+    # Identical submissions are served from the PDF cache; the cache key is the ETag
+    services = _services()
+    etag = report_cache_key(form_data, render_config_version())
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+        response.set_etag(etag)
+        return response
+
+    draft = '_DRAFT' if form_data['render_profile'] in ('draft', 'draft-full') else ''
+    download_name = f"Inspection_Report_{form_data['claim_number'] or 'NoClaim'}{draft}.pdf"
+    try:
+        pdf = services.pdf_cache.get(etag)
+        if pdf is None and services.job_queue is not None:
+            # Async mode: hand the render to the background workers and let the client poll
+            try:
+                job_id = services.job_queue.enqueue(form_data, current_user.id, download_name, current_user.username)
+            except QueueFullError as e:
+                flash(f"The report queue is full, please try again shortly. ({e})", 'danger')
+                return render_template('index.html', form_data=form_data), 503
+            return redirect(url_for('main.report_job_status', job_id=job_id))
+        if pdf is None and current_app.config['PDF_OUTPUT_MODE'] == 'spooled':
+            output = open_spooled_output(current_app.config['PDF_SPOOL_MAX_MEMORY'], current_app.config['PDF_SPOOL_DIR'])
+            with _render_slot(), timer.phase('render'):
+                body, size, in_memory = spooled_pdf_body(generate_inspection_report_pdf(form_data, output=output))
+            timer.set(size=size)
+            if not in_memory:
+                # Large report: stream it from the temp file (closed and removed once
+                # sent) and keep it out of the in-memory PDF cache
+                _archive_report(body, form_data, timer)
+                body.seek(0)
+                with timer.phase('send_file'):
+                    response = send_file(body,
+                                         mimetype='application/pdf',
+                                         as_attachment=True,
+                                         download_name=download_name,
+                                         etag=etag)
+                response.content_length = size
+                return response
+            pdf = body.getvalue()
+            services.pdf_cache.put(etag, pdf)
+        elif pdf is None:
+            with _render_slot(), timer.phase('render'):
+                pdf = generate_inspection_report_pdf(form_data).getvalue()
+            services.pdf_cache.put(etag, pdf)
+        timer.set(size=len(pdf))
+        _archive_report(pdf, form_data, timer)
+        with timer.phase('send_file'):
+            response = send_file(io.BytesIO(pdf),
+                                 mimetype='application/pdf',
+                                 as_attachment=True,
+                                 download_name=download_name,
+                                 etag=etag)
+        return response
+    except AdmissionRejected as e:
+        # Overloaded: fail fast and tell the client when to come back
+        flash(f"The server is busy generating other reports, please try again in {e.retry_after} seconds.", 'danger')
+        response = current_app.make_response((render_template('index.html', form_data=form_data), 503))
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response
+    except Exception as e:
+        # When an error occurs, pass back the form_data so user doesn't lose input
+        flash(f"Error generating PDF: {e}", 'danger')
+        return render_template('index.html', form_data=form_data)
+
 
 # Main report generation form - requires login
-@app.route('/generate_report', methods=['GET', 'POST'])
+@main.route('/generate_report', methods=['GET', 'POST'])
 @login_required # <--- THIS ROUTE IS NOW PROTECTED
 def generate_report_form():
     if request.method == 'POST':
-        form_data = {
-            'report_title': request.form.get('report_title', 'Inspection Report'),
-            'inspector_name': request.form.get('inspector_name', ''),
-            'inspector_address': request.form.get('inspector_address', ''),
-            'adjuster_name': request.form.get('adjuster_name', ''),
-            'adjuster_number': request.form.get('adjuster_number', ''),
-            'adjuster_email': request.form.get('adjuster_email', ''),
-            'report_date': request.form.get('report_date', ''),
-            'claim_number': request.form.get('claim_number', ''),
-            'year_built': request.form.get('year_built', ''),
-            'cause_of_loss_heading': request.form.get('cause_of_loss_heading', 'Cause of Loss'),
-            'cause_of_loss': request.form.get('cause_of_loss', ''),
-            'resulting_damages_heading': request.form.get('resulting_damages_heading', 'Resulting Damages'),
-            'resulting_damages': request.form.get('resulting_damages', ''),
-            'scope_of_work_heading': request.form.get('scope_of_work_heading', 'Scope of Work'),
-            'scope_of_work': request.form.get('scope_of_work', ''),
-            'recommendations_heading': request.form.get('recommendations_heading', 'Recommendations'),
-            'recommendations': request.form.get('recommendations', ''),
-            'reserves_heading': request.form.get('reserves_heading', 'Estimated Reserves'),
-            'reserves_input': request.form.get('reserves_input', ''),
-            'disclaimer_heading': request.form.get('disclaimer_heading', 'Disclaimer'),
-            'disclaimer': request.form.get('disclaimer', '')
-        }
-
+        timer = metrics.begin_report()
         try:
-            pdf_buffer = generate_inspection_report_pdf(form_data)
-            response = send_file(pdf_buffer,
-                                 mimetype='application/pdf',
-                                 as_attachment=True,
-                                 download_name=f"Inspection_Report_{form_data['claim_number'] or 'NoClaim'}.pdf")
-            return response
-        except Exception as e:
-            # When an error occurs, pass back the form_data so user doesn't lose input
-            flash(f"Error generating PDF: {e}", 'danger')
-            return render_template('index.html', form_data=form_data)
+            try:
+                with timer.phase('parse_form'):
+                    form, files, problems = _read_report_form()
+                    form_data = build_form_data(form)
+            except RequestEntityTooLarge:
+                # Only an urlencoded post over the text limit, or a request past the
+                # app-wide MAX_CONTENT_LENGTH / MAX_FORM_PARTS; nothing was parsed
+                flash("The form is larger than the server accepts.", 'danger')
+                return render_template('index.html', form_data=default_report_data()), 413
+            with timer.phase('photos'): # Processing itself runs in the background
+                # Photos that did arrive are kept even if others were too large, so
+                # their ids come back in the form and need not be uploaded again
+                error = _attach_photos(form_data, files)
+            if problems or error:
+                for message in problems + ([error] if error else []):
+                    flash(message, 'danger')
+                # Pass back the form_data so user doesn't lose input
+                return render_template('index.html', form_data=form_data), 413 if problems else 400
+            return _report_response(form_data, timer)
+        finally:
+            timer.finish()
 
     # Pre-fill *all* fields with initial default values for GET requests
-    # Current date in MDT (Calgary) format
-    current_date_mdt = datetime.now().strftime("%B %d, %Y")
-
-    default_data = {
-        'report_title': "Property Inspection Report",
-        'inspector_name': "John Doe",
-        'inspector_address': "123 Inspection Lane, Suite 456, Calgary, AB T2Y 3X4",
-        'adjuster_name': "Jane Smith",
-        'adjuster_number': "555-123-4567",
-        'adjuster_email': "jane.smith@example.com",
-        'report_date': current_date_mdt,
-        'claim_number': "CLM-2025-06-001",
-        'year_built': "2005",
-        'cause_of_loss_heading': "Cause of Loss",
-        'cause_of_loss': "High winds caused a large tree branch to fall onto the roof, puncturing the shingles and underlying sheathing. The incident occurred during a severe thunderstorm.",
-        'resulting_damages_heading': "Resulting Damages",
-        'resulting_damages': "Significant damage to the roof structure, including compromised trusses and water infiltration into the attic space. Partial ceiling collapse in the master bedroom due to water saturation. Damage to drywall, insulation, and some personal belongings in the affected area. Minor water staining observed on walls in adjacent rooms.",
-        'scope_of_work_heading': "Scope of Work",
-        'scope_of_work': "1. Remove and dispose of damaged roofing materials and debris.\n2. Repair/replace compromised roof trusses and sheathing.\n3. Install new roofing underlayment and shingles (to match existing).\n4. Remove damaged ceiling and drywall in master bedroom.\n5. Dry affected areas and apply mold preventative.\n6. Replace insulation, drywall, and paint in affected areas.\n7. Clean and restore any salvageable personal belongings; document non-salvageable items.",
-        'recommendations_heading': "Recommendations",
-        'recommendations': "1. Recommend engaging a licensed roofing contractor for all roof repairs.\n2. Advise the homeowner to have a qualified electrician inspect wiring in the attic space due to potential water exposure.\n3. Suggest contacting an arborist to trim overhanging branches from other trees to prevent future incidents.",
-        'reserves_heading': "Estimated Reserves",
-        'reserves_input': "Roof Repair: 15000.00\nInterior Repair: 3500.00\nContents: 2000.00\nContingency: 2500.00",
-        'disclaimer_heading': "Disclaimer",
-        'disclaimer': (
-            "This inspection report is based on observations made at the time of the inspection and represents "
-            "the inspector's professional opinion. It is not an exhaustive list of all defects or conditions "
-            "and does not constitute a warranty or guarantee of any kind. Further investigation by specialists "
-            "may be required for certain findings. Estimated reserves are preliminary and subject to change based "
-            "on detailed assessments and actual repair costs. All parties should independently verify any information "
-            "contained herein and consult with appropriate professionals before making decisions."
-        )
-    }
+    default_data = default_report_data()
     # Pass current_user to template for conditional display of links
     return render_template('index.html', form_data=default_data)
 
+# Async report job status - polled by the browser (HTML) or by API clients (JSON)
+@main.route('/jobs/<job_id>')
+@login_required
+def report_job_status(job_id):
+    services = _services()
+    job = services.job_queue.get(job_id, current_user.id) if services.job_queue is not None else None
+    if job is None:
+        abort(404)
+    status = {
+        'id': job['id'],
+        'status': job['status'],
+        'error': job['error'],
+        'status_url': url_for('main.report_job_status', job_id=job['id']),
+        'download_url': url_for('main.report_job_download', job_id=job['id']) if job['status'] == DONE else None,
+    }
+    if request.args.get('format') == 'json' or request.accept_mimetypes.best == 'application/json':
+        return jsonify(status)
+    return render_template('job_status.html', title='Report Status', job=status)
+
+@main.route('/jobs/<job_id>/download')
+@login_required
+def report_job_download(job_id):
+    services = _services()
+    job = services.job_queue.get(job_id, current_user.id) if services.job_queue is not None else None
+    if job is None or job['status'] != DONE or not os.path.exists(job['result_path']):
+        abort(404)
+    return send_file(os.path.abspath(job['result_path']),
+                     mimetype='application/pdf',
+                     as_attachment=True,
+                     download_name=job['download_name'])
+
+# Batch report generation - CSV/JSONL upload in, streamed ZIP of PDFs out
+@main.route('/generate_reports_batch', methods=['GET', 'POST'])
+@login_required
+def generate_reports_batch():
+    services = _services()
+    if request.method == 'POST':
+        upload = request.files.get('batch_file')
+        if not upload or not upload.filename:
+            flash('Please choose a CSV or JSONL file to upload.', 'danger')
+            return render_template('batch.html', title='Batch Reports')
+        try:
+            rows = parse_batch_upload(upload.filename, upload.stream, current_app.config['BATCH_MAX_ROWS'])
+        except (BatchInputError, UnicodeDecodeError) as e:
+            flash(f"Error reading batch file: {e}", 'danger')
+            return render_template('batch.html', title='Batch Reports')
+
+        max_workers = current_app.config['BATCH_MAX_WORKERS']
+        executor = get_executor(max_workers)
+        download_name = f"Inspection_Reports_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+        on_pdf = None
+        if services.report_archive is not None:
+            owner = _archive_owner() # current_user is gone once the response starts streaming
+
+            def on_pdf(row, pdf):
+                try:
+                    services.report_archive.store(pdf, build_form_data(row), *owner)
+                except Exception as e:
+                    print(f"Error archiving batch report: {e}")
+        # Every row in flight holds a render slot under the user's fairness key, so
+        # a batch waits its turn between rows instead of starving single reports
+        return Response(stream_with_context(stream_batch_zip(rows, executor, max_in_flight=2 * max_workers,
+                                                             on_pdf=on_pdf, admission=services.render_admission,
+                                                             admission_user=_admission_user(),
+                                                             row_timeout=current_app.config['BATCH_ROW_TIMEOUT_SECONDS'])),
+                        mimetype='application/zip',
+                        headers={'Content-Disposition': f'attachment; filename="{download_name}"'})
+
+    return render_template('batch.html', title='Batch Reports')
+
+# Report history - the user's archived reports, newest first, optionally for one claim
+@main.route('/reports/history')
+@login_required
+def report_history():
+    services = _services()
+    if services.report_archive is None:
+        abort(404)
+    claim_number = request.args.get('claim_number', '').strip() or None
+    before_id = request.args.get('before', type=int)
+    entries = services.report_archive.history(claim_number=claim_number, user_id=_archive_owner()[0],
+                                              before_id=before_id, limit=HISTORY_PAGE_SIZE)
+    next_before = entries[-1]['id'] if len(entries) == HISTORY_PAGE_SIZE else None
+    for entry in entries:
+        entry['created'] = datetime.fromtimestamp(entry['created_at']).strftime('%Y-%m-%d %H:%M')
+        entry['download_url'] = url_for('main.archived_report_download', report_id=entry['id'])
+    if request.args.get('format') == 'json' or request.accept_mimetypes.best == 'application/json':
+        return jsonify(reports=entries, next_before=next_before)
+    return render_template('history.html', title='Report History', reports=entries,
+                           claim_number=claim_number or '', next_before=next_before)
+
+# Archived PDFs are served straight from disk: no re-render, Range requests and
+# conditional GETs are handled by send_file, and the file is handed to the WSGI
+# server's file wrapper (sendfile) rather than read into memory
+@main.route('/reports/<int:report_id>/download')
+@login_required
+def archived_report_download(report_id):
+    # Archive ids are sequential, so other users' reports are a 404 like missing ones
+    services = _services()
+    entry = services.report_archive.get(report_id, _archive_owner()[0]) if services.report_archive is not None else None
+    if entry is None or not os.path.exists(entry['path']):
+        abort(404)
+    return send_file(os.path.abspath(entry['path']),
+                     mimetype='application/pdf',
+                     as_attachment=True,
+                     download_name=f"Inspection_Report_{entry['claim_number'] or 'NoClaim'}_{entry['id']}.pdf",
+                     etag=entry['pdf_sha256'],
+                     conditional=True,
+                     max_age=86400)
+
+# PDF cache counters, for sizing PDF_CACHE_MAX_BYTES
+@main.route('/cache_stats')
+@login_required
+def cache_stats():
+    return jsonify(_services().pdf_cache.stats())
+
+# Prometheus text exposition of report timings and cache/queue state
+def _cache_metrics():
+    services = _services()
+    lines = []
+    for key, value in services.pdf_cache.stats().items():
+        lines += gauge_lines(f"pdf_cache_{key}", f"PDF cache {key.replace('_', ' ')}.", value)
+    for cache, stats in layout_cache_stats().items():
+        for key in ('hits', 'misses', 'evictions', 'entries'):
+            lines += gauge_lines(f"layout_cache_{cache}_{key}", f"Layout cache ({cache}) {key}.", stats[key])
+    for key, value in services.user_cache.stats().items():
+        if key in ('hits', 'misses', 'evictions', 'invalidations', 'entries'):
+            lines += gauge_lines(f"user_cache_{key}", f"Session user cache {key}.", value)
+    if services.render_admission is not None:
+        lines += services.render_admission.prometheus_lines()
+    if services.report_archive is not None:
+        for key, value in services.report_archive.stats().items():
+            lines += gauge_lines(f"report_archive_{key}", f"Archived {key}.", value)
+    for key, value in photo_store.stats().items():
+        lines += gauge_lines(f"photo_store_{key}", f"Photo store {key}.", value)
+    if services.job_queue is not None:
+        lines += gauge_lines('report_job_queue_depth', 'Queued and running report jobs.', services.job_queue.queue_depth())
+    return lines
+
+metrics.register_collector(_cache_metrics)
+
+@main.route('/metrics')
+def prometheus_metrics():
+    return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
 # Context processor to make current_user available in all templates
-@app.context_processor
+@main.app_context_processor
 def inject_current_user():
     return dict(current_user=current_user)
 
 # --- Database Initialization on First Run ---
-with app.app_context():
+def _init_db():
     db.create_all() # Creates tables based on models.py if they don't exist
     # Optional: Create a default admin user on first run if no users exist
     if User.query.count() == 0:
@@ -400,6 +438,94 @@ with app.app_context():
         db.session.commit()
         print("Default admin user 'admin' (password: adminpass) created.")
 
+# --- Pre-fork Warmup ---
+# Under a preforking server (e.g. gunicorn --preload wsgi:app) the master imports
+# the app once and forks the workers. Loading the fonts, styles, logo and
+# templates and rendering one throwaway report here means every worker starts
+# with them already in memory, shared copy-on-write, instead of paying for
+# them on its first report.
+def warmup(app):
+    get_report_styles(FONT_NAME_NORMAL, FONT_NAME_BOLD)
+    for name in app.jinja_env.list_templates(extensions=['html']):
+        app.jinja_env.get_template(name) # Compiled templates are cached on the environment
+    with app.test_request_context():
+        render_template('index.html', form_data=default_report_data()) # Also warms routing and url_for
+
+    # The throwaway renders (one per profile) load the logo and fill ReportLab's
+    # font and layout caches; they are kept out of the report metrics so workers
+    # do not inherit fake observations
+    metrics_enabled = metrics.enabled
+    metrics.enabled = False
+    try:
+        for profile in RENDER_PROFILES:
+            generate_inspection_report_pdf(default_report_data(), profile=profile)
+    finally:
+        metrics.enabled = metrics_enabled
+
+    with app.app_context():
+        # Forked workers must not share the master's database connections.
+        # An in-memory SQLite database only lives in its one connection.
+        if db.engine.url.database not in (None, '', ':memory:'):
+            db.engine.dispose()
+
+    # Move everything loaded so far out of the collector's generations, so
+    # collections in the workers do not touch (and un-share) those pages
+    gc.collect()
+    gc.freeze()
+
+# --- Application Factory ---
+def create_app(config_class=Config):
+    # Nothing is created at import time; wsgi.py holds the app for WSGI servers
+    app = Flask(__name__)
+    app.config.from_object(config_class) # Load config from Config class
+
+    # Initialize extensions
+    db.init_app(app)
+    bcrypt.init_app(app)
+    login_manager.init_app(app)
+    app.register_blueprint(main)
+
+    pdf_cache = PDFCache(app.config['PDF_CACHE_MAX_BYTES'])
+
+    metrics.configure(enabled=app.config['METRICS_ENABLED'],
+                      slow_threshold=app.config['SLOW_REPORT_THRESHOLD_SECONDS'],
+                      slow_log_path=app.config['SLOW_REPORT_LOG'])
+
+    render_admission = None
+    if app.config['RENDER_MAX_CONCURRENT'] > 0:
+        render_admission = AdmissionController(app.config['RENDER_MAX_CONCURRENT'],
+                                               max_queue=app.config['RENDER_MAX_QUEUE'],
+                                               max_wait=app.config['RENDER_MAX_WAIT_SECONDS'],
+                                               max_per_user=app.config['RENDER_MAX_PER_USER'])
+
+    report_archive = None
+    if app.config['REPORT_ARCHIVE_ENABLED']:
+        report_archive = ReportArchive(app.config['REPORT_ARCHIVE_DIR'])
+
+    job_queue = None
+    if app.config['REPORT_ASYNC_ENABLED']:
+        job_queue = JobQueue(app.config['REPORT_JOB_DB'],
+                             app.config['REPORT_JOB_RESULTS_DIR'],
+                             workers=app.config['REPORT_JOB_WORKERS'],
+                             max_queue=app.config['REPORT_JOB_MAX_QUEUE'],
+                             ttl_seconds=app.config['REPORT_JOB_TTL_SECONDS'],
+                             archive=report_archive)
+
+    user_cache = UserCache(ttl_seconds=app.config['USER_CACHE_TTL_SECONDS'],
+                           max_entries=app.config['USER_CACHE_MAX_ENTRIES'],
+                           shared_path=app.config['USER_CACHE_SHARED_DB'])
+
+    app.extensions['report_services'] = ReportServices(pdf_cache, user_cache, render_admission=render_admission,
+                                                       report_archive=report_archive, job_queue=job_queue)
+
+    with app.app_context():
+        _init_db()
+    photo_store.sweep_incoming() # Uploads left behind by a process that died while processing them
+
+    if app.config['PREFORK_WARMUP']:
+        warmup(app)
+    return app
+
 
 if __name__ == '__main__':
     os.makedirs('templates', exist_ok=True)
@@ -417,4 +543,5 @@ if __name__ == '__main__':
     print("Default admin user (if created): admin / adminpass")
     print("Press Ctrl+C to stop the server.")
     print("-----------------------------------------------------------\n")
+    app = create_app()
     app.run(host="0.0.0.0", port=7000, debug=True)
\ No newline at end of file
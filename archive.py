@@ -0,0 +1,162 @@
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import time
+
+# --- Report Archive ---
+# Every rendered PDF is kept together with the form data it was rendered from,
+# so old reports can be downloaded again without re-rendering. PDFs are stored
+# content-addressed (objects/<sha256[:2]>/<sha256>.pdf), so identical outputs
+# share one file. An SQLite index records each render by claim number, user,
+# report date and hash; history lookups page by id rather than OFFSET, so they
+# stay fast as the table grows. Files are only ever added, never rewritten,
+# which makes them safe to serve with sendfile and HTTP Range requests.
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS archived_reports (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    pdf_sha256 TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    claim_number TEXT NOT NULL,
+    report_date TEXT NOT NULL,
+    render_profile TEXT NOT NULL,
+    user_id INTEGER,
+    username TEXT,
+    created_at REAL NOT NULL,
+    form_data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_archived_reports_claim ON archived_reports (claim_number, id);
+CREATE INDEX IF NOT EXISTS ix_archived_reports_user ON archived_reports (user_id, id);
+CREATE INDEX IF NOT EXISTS ix_archived_reports_date ON archived_reports (report_date, id);
+CREATE INDEX IF NOT EXISTS ix_archived_reports_sha ON archived_reports (pdf_sha256);
+"""
+
+# Columns returned by history(); the (possibly large) form data is left out
+_SUMMARY_COLUMNS = 'id, pdf_sha256, size, claim_number, report_date, render_profile, user_id, username, created_at'
+
+_COPY_CHUNK = 1024 * 1024
+
+
+class ReportArchive:
+    def __init__(self, root_dir, db_path=None):
+        self.root_dir = root_dir
+        self.objects_dir = os.path.join(root_dir, 'objects')
+        self.db_path = db_path or os.path.join(root_dir, 'archive.db')
+        os.makedirs(self.objects_dir, exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(_SCHEMA)
+        finally:
+            conn.close()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def object_path(self, sha256):
+        return os.path.join(self.objects_dir, sha256[:2], f"{sha256}.pdf")
+
+    def _store_object(self, source):
+        # Stream into a temp file next to the objects while hashing, then move it
+        # into place unless an identical PDF is already stored.
+        digest = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=self.objects_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                if isinstance(source, (bytes, bytearray, memoryview)):
+                    digest.update(source)
+                    f.write(source)
+                else:
+                    while True:
+                        chunk = source.read(_COPY_CHUNK)
+                        if not chunk:
+                            break
+                        digest.update(chunk)
+                        f.write(chunk)
+                size = f.tell()
+            sha256 = digest.hexdigest()
+            path = self.object_path(sha256)
+            if os.path.exists(path):
+                os.remove(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.chmod(tmp_path, 0o644)
+                os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return sha256, size
+
+    def store(self, source, form_data, user_id=None, username=None):
+        """Archive a rendered PDF (bytes or a binary file object read from its
+        current position) with its form data. Returns the new archive id."""
+        sha256, size = self._store_object(source)
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                'INSERT INTO archived_reports (pdf_sha256, size, claim_number, report_date, render_profile, '
+                'user_id, username, created_at, form_data) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (sha256, size, form_data.get('claim_number', ''), form_data.get('report_date', ''),
+                 form_data.get('render_profile', ''), user_id, username, time.time(), json.dumps(form_data))
+            )
+            return cursor.lastrowid
+        finally:
+            conn.close()
+
+    def get(self, report_id, user_id=None):
+        """The archive entry (including form_data) for report_id, or None.
+
+        With user_id, entries archived by any other user are also None.
+        """
+        conn = self._connect()
+        try:
+            row = conn.execute('SELECT * FROM archived_reports WHERE id = ?', (report_id,)).fetchone()
+        finally:
+            conn.close()
+        if row is None or (user_id is not None and row['user_id'] != user_id):
+            return None
+        entry = dict(row)
+        entry['form_data'] = json.loads(entry['form_data'])
+        entry['path'] = self.object_path(entry['pdf_sha256'])
+        return entry
+
+    def history(self, claim_number=None, user_id=None, report_date=None, pdf_sha256=None,
+                before_id=None, limit=50):
+        """Newest-first archive entries matching all given filters.
+
+        Pass the smallest id of one page as before_id to get the next page.
+        """
+        clauses, params = [], []
+        for column, value in (('claim_number', claim_number), ('user_id', user_id),
+                              ('report_date', report_date), ('pdf_sha256', pdf_sha256)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if before_id is not None:
+            clauses.append('id < ?')
+            params.append(before_id)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                f"SELECT {_SUMMARY_COLUMNS} FROM archived_reports {where} ORDER BY id DESC LIMIT ?",
+                params + [limit]
+            ).fetchall()
+        finally:
+            conn.close()
+        return [dict(row) for row in rows]
+
+    def stats(self):
+        # Entries are never deleted, so the last id is the number of reports
+        # (a COUNT over hundreds of thousands of rows is too slow per scrape)
+        conn = self._connect()
+        try:
+            reports = conn.execute('SELECT COALESCE(MAX(id), 0) FROM archived_reports').fetchone()[0]
+        finally:
+            conn.close()
+        return {'reports': reports}
@@ -0,0 +1,268 @@
+import csv
+import io
+import json
+import multiprocessing
+import os
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from werkzeug.utils import secure_filename
+
+from report import generate_inspection_report_pdf, build_form_data
+from admission import AdmissionRejected, QUEUE_FULL
+
+# --- Batch Report Generation ---
+# After storm events claims arrive by the hundred. A CSV or JSONL upload (one
+# row per claim, same keys as the report form) is rendered across a process
+# pool and streamed back as a ZIP that grows as PDFs finish. Only a bounded
+# number of finished PDFs is held in memory at any time, and per-row failures
+# are recorded in manifest.csv inside the archive instead of aborting the batch.
+# With render admission control every row in flight holds a render slot, so
+# batch rows compete with single reports instead of running beside them.
+#
+# Workers are started from a forkserver, not forked from the web process: that
+# process runs job, photo and server threads, and a child forked while one of
+# them holds a lock (style registry, layout cache, logging) can deadlock. A row
+# that still takes longer than the row timeout is recorded as failed and the
+# pool's workers are killed and replaced.
+
+
+class BatchInputError(Exception):
+    pass
+
+
+_executor = None
+_executor_pid = None
+
+
+def _new_executor(max_workers):
+    context = multiprocessing.get_context('forkserver')
+    context.set_forkserver_preload(['batch']) # Workers start with the report code already imported
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=context)
+
+
+def get_executor(max_workers):
+    # One pool per process; a forked web worker must not reuse its parent's pool
+    global _executor, _executor_pid
+    if _executor is None or _executor_pid != os.getpid() or getattr(_executor, '_broken', False):
+        _executor = _new_executor(max_workers)
+        _executor_pid = os.getpid()
+    return _executor
+
+
+def _replace_executor(executor):
+    global _executor
+    executor.shutdown(wait=False, cancel_futures=True)
+    replacement = _new_executor(executor._max_workers)
+    if executor is _executor:
+        _executor = replacement
+    return replacement
+
+
+def replace_broken_executor(executor):
+    """Return executor, or a fresh pool in its place if one of its workers died
+    (e.g. OOM killed), which leaves a ProcessPoolExecutor unusable for good."""
+    if not getattr(executor, '_broken', False):
+        return executor
+    return _replace_executor(executor)
+
+
+def kill_executor(executor):
+    """Terminate the pool's workers, hung renders included, and return a fresh pool."""
+    for process in list((executor._processes or {}).values()):
+        process.terminate()
+    return _replace_executor(executor)
+
+
+def parse_batch_upload(filename, stream, max_rows):
+    """Return a list of (row_number, row) from a CSV or JSONL upload.
+
+    Rows that cannot be decoded are returned as (row_number, BatchInputError)
+    so they end up in the manifest like any other failed row.
+    """
+    ext = os.path.splitext(filename or '')[1].lower()
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    rows = []
+    if ext == '.csv':
+        for row_number, row in enumerate(csv.DictReader(text), start=1):
+            rows.append((row_number, row))
+            if len(rows) > max_rows:
+                break
+    elif ext in ('.jsonl', '.ndjson'):
+        row_number = 0
+        for line in text:
+            if not line.strip():
+                continue
+            row_number += 1
+            try:
+                row = json.loads(line)
+                if not isinstance(row, dict):
+                    raise ValueError('expected a JSON object')
+            except ValueError as e:
+                row = BatchInputError(f"Invalid JSON: {e}")
+            rows.append((row_number, row))
+            if len(rows) > max_rows:
+                break
+    else:
+        raise BatchInputError('Upload a .csv or .jsonl file.')
+    if not rows:
+        raise BatchInputError('The uploaded file contains no rows.')
+    if len(rows) > max_rows:
+        raise BatchInputError(f"Batches are limited to {max_rows} rows.")
+    return rows
+
+
+def render_batch_row(row):
+    # Runs in a worker process
+    return generate_inspection_report_pdf(build_form_data(row)).getvalue()
+
+
+class _ChunkSink:
+    # Write-only, unseekable file object: zipfile then streams entries with data
+    # descriptors and we hand each written chunk straight to the response.
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        chunks, self.chunks = self.chunks, []
+        return b''.join(chunks)
+
+
+def _pdf_name(row_number, row):
+    claim = secure_filename(str(row.get('claim_number') or '')) or 'NoClaim'
+    return f"{row_number:05d}_Inspection_Report_{claim}.pdf"
+
+
+def _take_slot(admission, user, block):
+    # True once a render slot is held. Without block, only a slot that is free
+    # right now is taken: rows of this batch are in flight and free one anyway,
+    # and waiting single reports go first.
+    if admission.try_acquire(user):
+        return True
+    while block:
+        try:
+            admission.acquire(user) # Queued fairly with everyone else
+            return True
+        except AdmissionRejected as e:
+            if e.reason == QUEUE_FULL:
+                time.sleep(min(e.retry_after, 5))
+    return False
+
+
+def stream_batch_zip(rows, executor, max_in_flight, on_pdf=None, admission=None, admission_user=None,
+                     row_timeout=None):
+    """Yield the bytes of a ZIP archive holding one PDF per row plus a manifest.
+
+    on_pdf(row, pdf), if given, is called for every successfully rendered row.
+    With an AdmissionController, each row holds a slot under admission_user
+    while it renders. A row still rendering after row_timeout seconds is
+    recorded as failed.
+    """
+    sink = _ChunkSink()
+    manifest = []
+
+    def release(started):
+        if admission is not None:
+            admission.release(admission_user, time.perf_counter() - started)
+
+    with zipfile.ZipFile(sink, mode='w', compression=zipfile.ZIP_STORED) as archive:
+        pending = {}
+        queued = iter(rows)
+        next_row = None
+        try:
+            while True:
+                # Keep at most max_in_flight renders outstanding so finished PDFs
+                # never pile up in memory faster than they are streamed out.
+                while len(pending) < max_in_flight:
+                    if next_row is None:
+                        next_row = next(queued, None)
+                        if next_row is None:
+                            break
+                    row_number, row = next_row
+                    if isinstance(row, Exception):
+                        manifest.append([row_number, '', '', 'error', str(row)])
+                        next_row = None
+                        continue
+                    if admission is not None and not _take_slot(admission, admission_user, block=not pending):
+                        break
+                    started = time.perf_counter()
+                    next_row = None
+                    try:
+                        try:
+                            future = executor.submit(render_batch_row, row)
+                        except BrokenProcessPool:
+                            executor = replace_broken_executor(executor)
+                            future = executor.submit(render_batch_row, row)
+                    except BrokenProcessPool as e:
+                        release(started)
+                        manifest.append([row_number, row.get('claim_number', ''), '', 'error', f"BrokenProcessPool: {e}"])
+                        continue
+                    except BaseException:
+                        release(started)
+                        raise
+                    pending[future] = (row_number, row, started, started)
+                if not pending:
+                    break
+                timeout = None
+                if row_timeout is not None:
+                    oldest = min(submitted for _, _, _, submitted in pending.values())
+                    timeout = max(0.0, oldest + row_timeout - time.perf_counter())
+                done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    # A render is stuck. Its worker cannot be cancelled, only killed with
+                    # the rest of the pool; the other rows in flight start over on the new one
+                    now = time.perf_counter()
+                    for future, (row_number, row, started, submitted) in list(pending.items()):
+                        if now - submitted >= row_timeout:
+                            del pending[future]
+                            release(started)
+                            manifest.append([row_number, row.get('claim_number', ''), '', 'error',
+                                             f"Timed out after {row_timeout:g} s; row not rendered."])
+                    executor = kill_executor(executor)
+                    for future, (row_number, row, started, submitted) in list(pending.items()):
+                        del pending[future]
+                        pending[executor.submit(render_batch_row, row)] = (row_number, row, started, now)
+                    continue
+                for future in done:
+                    row_number, row, started, _ = pending.pop(future)
+                    release(started)
+                    claim_number = row.get('claim_number', '')
+                    try:
+                        pdf = future.result()
+                    except BrokenProcessPool:
+                        # A worker died mid-render; the rows it took down are lost, the rest
+                        # of the batch continues on a fresh pool
+                        executor = replace_broken_executor(executor)
+                        manifest.append([row_number, claim_number, '', 'error',
+                                         'Worker process died while rendering; row not rendered.'])
+                        continue
+                    except Exception as e:
+                        manifest.append([row_number, claim_number, '', 'error', f"{type(e).__name__}: {e}"])
+                        continue
+                    if on_pdf is not None:
+                        on_pdf(row, pdf)
+                    name = _pdf_name(row_number, row)
+                    archive.writestr(name, pdf)
+                    manifest.append([row_number, claim_number, name, 'ok', ''])
+                    yield sink.drain()
+        finally:
+            # Client went away: don't keep rendering rows nobody will receive
+            for future, (_, _, started, _) in pending.items():
+                future.cancel()
+                release(started)
+
+        manifest_text = io.StringIO()
+        writer = csv.writer(manifest_text)
+        writer.writerow(['row', 'claim_number', 'file', 'status', 'error'])
+        writer.writerows(sorted(manifest, key=lambda entry: entry[0]))
+        archive.writestr('manifest.csv', manifest_text.getvalue(), compress_type=zipfile.ZIP_DEFLATED)
+    yield sink.drain()
@@ -0,0 +1,80 @@
+"""Benchmark: time-to-first-report in forked workers, with and without pre-fork warmup.
+
+For each mode a fresh interpreter imports wsgi (as a preforking server's master
+would), then forks workers one at a time; each worker times its first
+/generate_report POST and reports how much memory it had to copy (private dirty
+pages, Linux only).
+Run from the repository root:  python benchmarks/bench_cold_start.py
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKERS = 5
+
+
+def private_dirty_kb():
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            for line in f:
+                if line.startswith('Private_Dirty:'):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+
+
+def master():
+    sys.path.insert(0, ROOT)
+    os.chdir(ROOT)
+    start = time.perf_counter()
+    import wsgi as web
+    import_seconds = time.perf_counter() - start
+    web.app.config['LOGIN_DISABLED'] = True
+    import report
+    data = report.default_report_data()
+
+    results = []
+    for _ in range(WORKERS):
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            client = web.app.test_client()
+            start = time.perf_counter()
+            response = client.post('/generate_report', data=data)
+            elapsed = time.perf_counter() - start
+            assert response.status_code == 200, response.status_code
+            os.write(write_fd, json.dumps([elapsed, private_dirty_kb()]).encode())
+            os._exit(0)
+        os.close(write_fd)
+        with os.fdopen(read_fd) as pipe:
+            results.append(json.loads(pipe.read()))
+        os.waitpid(pid, 0)
+    print(json.dumps({'import_seconds': import_seconds, 'workers': results}))
+
+
+def run_mode(warmup, db_dir):
+    env = dict(os.environ, PREFORK_WARMUP='1' if warmup else '0',
+               DATABASE_URL=f"sqlite:///{os.path.join(db_dir, 'warmup.db' if warmup else 'cold.db')}")
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), '--master'], env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+if __name__ == '__main__':
+    if sys.argv[1:] == ['--master']:
+        master()
+        sys.exit(0)
+    with tempfile.TemporaryDirectory() as db_dir:
+        for warmup in (False, True):
+            result = run_mode(warmup, db_dir)
+            first = [seconds * 1e3 for seconds, _ in result['workers']]
+            dirty = [kb for _, kb in result['workers'] if kb is not None]
+            print(f"warmup {'on ' if warmup else 'off'}: import {result['import_seconds'] * 1e3:7.1f} ms  "
+                  f"first report median {statistics.median(first):7.1f} ms (min {min(first):.1f}, max {max(first):.1f})"
+                  + (f"  private dirty after first report {statistics.median(dirty) / 1024:.1f} MB" if dirty else ''))
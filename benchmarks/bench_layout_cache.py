@@ -0,0 +1,44 @@
+"""Benchmark: default report with plain Paragraphs vs. the shared layout cache.
+
+Also checks that both variants produce byte-identical PDFs.
+Run from the repository root:  python benchmarks/bench_layout_cache.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reportlab import rl_config
+from reportlab.platypus import Paragraph
+
+import layout_cache
+import report
+
+NUMBER = 50
+
+
+def render(data):
+    return report.generate_inspection_report_pdf(data).getvalue()
+
+
+if __name__ == '__main__':
+    rl_config.invariant = 1 # Deterministic IDs/dates so outputs can be compared
+    data = report.default_report_data()
+    render(data) # Warm fonts, styles, logo and the layout cache
+
+    cached_pdf = render(data)
+    cached = min(timeit.repeat(lambda: render(data), number=NUMBER, repeat=5)) / NUMBER
+
+    report.CachedParagraph = Paragraph
+    try:
+        plain_pdf = render(data)
+        plain = min(timeit.repeat(lambda: render(data), number=NUMBER, repeat=5)) / NUMBER
+    finally:
+        report.CachedParagraph = layout_cache.CachedParagraph
+
+    print(f"plain Paragraph      : {plain * 1e3:7.2f} ms/report")
+    print(f"layout cache (warm)  : {cached * 1e3:7.2f} ms/report")
+    print(f"speedup              : {plain / cached:7.2f}x")
+    print(f"byte-identical output: {plain_pdf == cached_pdf}")
+    print(f"cache stats          : {layout_cache.layout_cache_stats()}")
@@ -0,0 +1,70 @@
+"""Benchmark: render time and peak memory as the free-text narrative grows.
+
+The cause of loss and resulting damages sections get narratives of increasing
+length, written as paragraphs separated by blank lines (split into one
+flowable each) and, for comparison, as one unbroken block of text. Also checks
+that the lazily fed story renders byte-identically to a fully built list.
+Run from the repository root:  python benchmarks/bench_long_text.py
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reportlab import rl_config
+
+import report
+import story
+
+SIZES_KB = (10, 20, 40, 80, 160)
+SENTENCE = "Water staining and deflection were observed along the north wall of the attic space. "
+PARAGRAPH = SENTENCE * 7
+
+
+def narrative(size_kb, blank_lines=True):
+    count = size_kb * 1024 // len(PARAGRAPH) + 1
+    return ('\n\n' if blank_lines else ' ').join([PARAGRAPH.strip()] * count)
+
+
+def render(data):
+    start = time.perf_counter()
+    pdf = report.generate_inspection_report_pdf(data).getvalue()
+    return time.perf_counter() - start, pdf
+
+
+def peak_kb(data):
+    tracemalloc.start()
+    try:
+        report.generate_inspection_report_pdf(data)
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def report_data(size_kb, blank_lines):
+    data = report.default_report_data()
+    data['cause_of_loss'] = data['resulting_damages'] = narrative(size_kb // 2, blank_lines)
+    return data
+
+
+if __name__ == '__main__':
+    rl_config.invariant = 1 # Deterministic output for the byte comparison
+    render(report.default_report_data()) # Warm fonts, styles and caches
+
+    lazy_pdf = render(report_data(40, True))[1]
+    report.LazyStory = list
+    try:
+        list_pdf = render(report_data(40, True))[1]
+    finally:
+        report.LazyStory = story.LazyStory
+    print(f"lazy story byte-identical to list: {lazy_pdf == list_pdf}\n")
+
+    print(f"{'narrative':>9}  {'paragraphs: time':>16}  {'ms/KB':>6}  {'peak':>9}  {'one block: time':>15}  {'ms/KB':>6}")
+    for size_kb in SIZES_KB:
+        split_seconds, pdf = render(report_data(size_kb, True))
+        block_seconds, _ = render(report_data(size_kb, False))
+        print(f"{size_kb:>6} KB  {split_seconds * 1e3:13.0f} ms  {split_seconds * 1e3 / size_kb:6.2f}  "
+              f"{peak_kb(report_data(size_kb, True)):6.0f} KB  {block_seconds * 1e3:12.0f} ms  "
+              f"{block_seconds * 1e3 / size_kb:6.2f}")
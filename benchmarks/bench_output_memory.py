@@ -0,0 +1,68 @@
+"""Memory benchmark: BytesIO output vs. spooled (spill-to-disk) output.
+
+For growing report sizes, each mode is run in a fresh interpreter and reports:
+  peak   - tracemalloc peak while rendering (dominated by ReportLab, which
+           assembles the whole PDF in memory before writing it out)
+  held   - memory still held by the output while the response is being sent
+  rss    - peak resident set size of the process
+
+Run from the repository root:  python benchmarks/bench_output_memory.py
+"""
+import gc
+import json
+import os
+import resource
+import subprocess
+import sys
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SPOOL_MAX_MEMORY = 64 * 1024
+SCOPE_LINES = [100, 2000, 10000, 20000]
+
+
+def _child(mode, lines):
+    sys.path.insert(0, ROOT)
+    os.chdir(ROOT)
+    from report import generate_inspection_report_pdf, open_spooled_output, spooled_pdf_body
+
+    data = {
+        'claim_number': 'BENCH-1',
+        'scope_of_work': '\n'.join(f"{i}. Remove and replace damaged drywall, insulation and trim in area {i}."
+                                   for i in range(lines)),
+    }
+    generate_inspection_report_pdf({'claim_number': 'warmup'})  # fonts, styles, logo
+
+    tracemalloc.start()
+    if mode == 'spooled':
+        output = generate_inspection_report_pdf(data, output=open_spooled_output(SPOOL_MAX_MEMORY))
+        body, size, _ = spooled_pdf_body(output)
+    else:
+        body = generate_inspection_report_pdf(data)
+        size = body.getbuffer().nbytes
+    gc.collect()  # ReportLab's document/canvas objects form reference cycles
+    held, peak = tracemalloc.get_traced_memory()
+    # Serve it the way a WSGI file wrapper would
+    while body.read(8192):
+        pass
+    tracemalloc.stop()
+    rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({'size': size, 'peak': peak, 'held': held, 'rss_kb': rss_kb}))
+
+
+def main():
+    print(f"{'lines':>6} {'mode':>8} {'pdf':>9} {'peak':>9} {'held':>9} {'rss':>9}")
+    for lines in SCOPE_LINES:
+        for mode in ('memory', 'spooled'):
+            out = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', mode, str(lines)],
+                                 capture_output=True, text=True, check=True).stdout
+            result = json.loads(out.strip().splitlines()[-1])
+            print(f"{lines:>6} {mode:>8} {result['size'] / 1024:>7.0f}KB {result['peak'] / 1024:>7.0f}KB "
+                  f"{result['held'] / 1024:>7.0f}KB {result['rss_kb'] / 1024:>7.1f}MB")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 4 and sys.argv[1] == '--child':
+        _child(sys.argv[2], int(sys.argv[3]))
+    else:
+        main()
@@ -0,0 +1,112 @@
+"""Benchmark: reports with phone-sized site photos.
+
+Compares embedding the raw 12 megapixel JPEGs in the PDF (the naive way) with
+the photo store: processing the photos one after another, processing them in
+the thread pool while the report renders (as the /generate_report route does),
+and re-rendering once they are stored. Reports wall time and PDF size, and
+checks that every photo is listed in a page's /Resources (viewers draw nothing
+for an XObject the page does not declare).
+Run from the repository root:  python benchmarks/bench_photos.py
+"""
+import io
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image as PILImage, ImageFilter
+from reportlab.platypus import Image
+
+import photos
+import report
+
+PHOTO_COUNT = 12
+PHOTO_SIZE = (4032, 3024) # 12 MP phone camera
+
+
+def phone_photo(seed):
+    # Blurred noise compresses about as badly as a real photo does
+    noise = PILImage.effect_noise((PHOTO_SIZE[0] // 4, PHOTO_SIZE[1] // 4), 40 + seed)
+    im = PILImage.merge('RGB', (noise, noise.rotate(90, expand=False), noise.transpose(PILImage.FLIP_LEFT_RIGHT)))
+    im = im.resize(PHOTO_SIZE).filter(ImageFilter.GaussianBlur(2))
+    out = io.BytesIO()
+    exif = PILImage.Exif()
+    exif[0x0112] = 6 if seed % 3 == 0 else 1 # Some taken in portrait
+    im.save(out, 'JPEG', quality=92, exif=exif.tobytes())
+    return out.getvalue()
+
+
+class RawPhotoStore:
+    """Embeds the uploads unprocessed, for comparison."""
+
+    def __init__(self, paths):
+        self.paths = paths
+
+    def flowable(self, photo_id, max_width=photos.PHOTO_MAX_WIDTH, max_height=photos.PHOTO_MAX_HEIGHT):
+        width, height = PHOTO_SIZE
+        scale = min(max_width / width, max_height / height)
+        return Image(self.paths[photo_id], width * scale, height * scale)
+
+
+def render(data):
+    start = time.perf_counter()
+    pdf = report.generate_inspection_report_pdf(data).getvalue()
+    return time.perf_counter() - start, len(pdf)
+
+
+def check_photo_resources(pdf, photo_ids):
+    declared = b' '.join(re.findall(rb'/XObject <<([^>]*)>>', pdf))
+    missing = [photo_id for photo_id in photo_ids if f"/FormXob.Photo{photo_id} ".encode() not in declared]
+    if missing:
+        sys.exit(f"{len(missing)} photo(s) not in any page's /Resources: {missing[:3]}")
+    print(f"all {len(photo_ids)} photos declared in page resources")
+
+
+def print_row(label, seconds, size=None):
+    size_text = f"{size / (1024 * 1024):8.1f} MB" if size is not None else ''
+    print(f"{label:<44} {seconds * 1000:9.0f} ms {size_text}")
+
+
+if __name__ == '__main__':
+    work_dir = tempfile.mkdtemp(prefix='bench_photos_')
+    try:
+        uploads = [phone_photo(i) for i in range(PHOTO_COUNT)]
+        print(f"{PHOTO_COUNT} photos, {PHOTO_SIZE[0]}x{PHOTO_SIZE[1]}, "
+              f"{sum(map(len, uploads)) / (1024 * 1024):.1f} MB uploaded, {os.cpu_count()} CPUs")
+        data = report.default_report_data()
+        render(data) # Warm fonts, styles and caches
+
+        raw_paths = {}
+        for i, upload in enumerate(uploads):
+            photo_id = f"{i:064x}" # Anything shaped like a SHA-256 passes parse_photo_ids
+            raw_paths[photo_id] = os.path.join(work_dir, f"raw_{i}.jpg")
+            with open(raw_paths[photo_id], 'wb') as f:
+                f.write(upload)
+        report.photo_store = RawPhotoStore(raw_paths)
+        print_row('raw JPEGs embedded', *render(dict(data, photos='\n'.join(raw_paths))))
+
+        start = time.perf_counter()
+        for upload in uploads:
+            photos.process_photo(io.BytesIO(upload))
+        print_row('process sequentially (no render)', time.perf_counter() - start)
+
+        report.photo_store = store = photos.PhotoStore(os.path.join(work_dir, 'store'))
+        start = time.perf_counter()
+        photo_ids = [store.submit(io.BytesIO(upload)) for upload in uploads]
+        _, size = render(dict(data, photos='\n'.join(photo_ids)))
+        print_row(f"submit + render, pool of {store.max_workers}", time.perf_counter() - start, size)
+
+        print_row('re-render, photos stored', *render(dict(data, photos='\n'.join(photo_ids))))
+        start = time.perf_counter()
+        for upload in uploads:
+            store.submit(io.BytesIO(upload))
+        print_row('re-submit identical uploads', time.perf_counter() - start)
+        print(store.stats())
+        check_photo_resources(report.generate_inspection_report_pdf(dict(data, photos='\n'.join(photo_ids))).getvalue(),
+                              photo_ids)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
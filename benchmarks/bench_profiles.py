@@ -0,0 +1,36 @@
+"""Benchmark: CPU time vs. output size for each render profile.
+
+Run from the repository root:  python benchmarks/bench_profiles.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import report
+
+NUMBER = 20
+
+
+def sample_reports():
+    default = report.default_report_data()
+    large = dict(default)
+    large['scope_of_work'] = '\n'.join(f"{i}. Remove and replace damaged drywall in area {i}." for i in range(1, 301))
+    large['reserves_input'] = '\n'.join(f"Line Item {i}: {100 + i * 7.25:.2f}" for i in range(1, 151))
+    return {'default': default, 'large': large}
+
+
+def cpu_time(data, profile):
+    start = time.process_time()
+    for _ in range(NUMBER):
+        pdf = report.generate_inspection_report_pdf(data, profile=profile).getvalue()
+    return (time.process_time() - start) / NUMBER, len(pdf)
+
+
+if __name__ == '__main__':
+    for name, data in sample_reports().items():
+        for profile in report.RENDER_PROFILES:
+            cpu_time(data, profile) # Warm fonts, styles, logo and layout caches
+            seconds, size = cpu_time(data, profile)
+            print(f"{name:<8} {profile:<10} cpu {seconds * 1e3:7.2f} ms/report  size {size / 1024:8.1f} KB")
@@ -0,0 +1,47 @@
+"""Benchmark: reserves section as one big Table vs. the high-volume ReserveTable.
+
+Renders only the reserves section of reports with increasing numbers of
+"Category: Amount" lines, so the scaling of each layout is visible.
+Run from the repository root:  python benchmarks/bench_reserves.py
+"""
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.units import inch
+from reportlab.platypus import SimpleDocTemplate
+
+import report
+from reserves import build_reserve_table, parse_reserve_lines, reserve_rows
+
+ROWS = (1000, 2500, 5000, 10000)
+
+
+def reserves_text(rows):
+    return '\n'.join(f"Building {i % 8 + 1}: Line Item {i}: ${1000 + i * 7.25:,.2f}" for i in range(rows))
+
+
+def render(flowable):
+    doc = SimpleDocTemplate(io.BytesIO(), pagesize=letter, topMargin=1.0 * inch, bottomMargin=1.0 * inch)
+    doc.build([flowable])
+    return doc.page
+
+
+def timed(make_flowable):
+    start = time.perf_counter()
+    pages = render(make_flowable())
+    return time.perf_counter() - start, pages
+
+
+if __name__ == '__main__':
+    print(f"{'rows':>6}  {'single Table':>14}  {'ReserveTable':>14}  {'pages':>11}")
+    for rows in ROWS:
+        text = reserves_text(rows)
+        legacy, legacy_pages = timed(lambda: report._reserve_table(reserve_rows(parse_reserve_lines(text))))
+        chunked, chunked_pages = timed(
+            lambda: build_reserve_table(text, report.FONT_NAME_NORMAL, report.FONT_NAME_BOLD))
+        print(f"{rows:>6}  {legacy * 1e3:11.0f} ms  {chunked * 1e3:11.0f} ms  {legacy_pages:>4} / {chunked_pages:<4}")
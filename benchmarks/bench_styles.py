@@ -0,0 +1,38 @@
+"""Microbenchmark: per-report style construction vs. the shared style registry.
+
+Run from the repository root:  python benchmarks/bench_styles.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reportlab.lib.styles import getSampleStyleSheet
+
+import styles
+
+PAGES_PER_REPORT = 3
+NUMBER = 2000
+
+
+def per_report_build():
+    # What every request used to pay: one sheet + report styles for the body,
+    # and one more sheet (plus two unused styles) on every page callback.
+    styles._build_styles('Roboto', 'Helvetica-Bold')
+    for _ in range(PAGES_PER_REPORT):
+        getSampleStyleSheet()
+
+
+def registry_lookup():
+    styles.get_report_styles('Roboto', 'Helvetica-Bold')
+    for _ in range(PAGES_PER_REPORT):
+        styles.get_report_styles('Roboto', 'Helvetica-Bold')
+
+
+if __name__ == '__main__':
+    before = min(timeit.repeat(per_report_build, number=NUMBER, repeat=5)) / NUMBER
+    after = min(timeit.repeat(registry_lookup, number=NUMBER, repeat=5)) / NUMBER
+    print(f"per-report style build : {before * 1e6:9.1f} us/report")
+    print(f"shared style registry  : {after * 1e6:9.1f} us/report")
+    print(f"saved per report       : {(before - after) * 1e6:9.1f} us ({before / after:.0f}x)")
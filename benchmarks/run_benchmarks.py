@@ -0,0 +1,268 @@
+"""Benchmark harness for the report render path and the /generate_report endpoint.
+
+Times generate_inspection_report_pdf on a matrix of synthetic reports (scope and
+recommendation lines, reserve rows, free-text length, logo and custom font on
+or off) and the full /generate_report POST through Flask's test client, with
+cold (empty caches) and warm passes. Reports latency percentiles, peak
+allocation and output size.
+
+Run from the repository root:
+
+    python benchmarks/run_benchmarks.py --save-baseline benchmarks/baseline.json
+    python benchmarks/run_benchmarks.py --compare benchmarks/baseline.json --threshold 0.15
+
+With --compare the exit status is 1 if any metric regressed by more than the
+threshold (a fraction of the baseline value).
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+# Keep the benchmark's users out of the real database
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+import reportlab
+from PIL import Image as PILImage
+from reportlab.lib.units import inch
+
+import layout_cache
+import report
+from logo_cache import LogoCache
+
+# Metrics compared against the baseline; lower is better for all of them
+COMPARED_METRICS = ('p50_ms', 'p90_ms', 'peak_alloc_kb', 'size_kb')
+
+
+def synthetic_report(lines=7, reserve_rows=4, text_chars=300):
+    data = report.default_report_data()
+    data['report_date'] = 'January 01, 2025'
+    sentence = "Water staining and deflection were observed along the north wall of the attic space. "
+    text = (sentence * (text_chars // len(sentence) + 1))[:text_chars]
+    data['cause_of_loss'] = text
+    data['resulting_damages'] = text
+    data['scope_of_work'] = '\n'.join(f"{i}. Remove and replace damaged drywall in area {i}." for i in range(1, lines + 1))
+    data['recommendations'] = '\n'.join(f"{i}. Have a licensed contractor inspect item {i}." for i in range(1, lines + 1))
+    data['reserves_input'] = '\n'.join(f"Line Item {i}: {100 + i * 7.25:.2f}" for i in range(1, reserve_rows + 1))
+    return data
+
+
+# name -> (report kwargs, logo on, custom font on)
+CASES = {
+    'default': ({}, True, True),
+    'lines-50': ({'lines': 50}, True, True),
+    'lines-500': ({'lines': 500}, True, True),
+    'reserves-100': ({'reserve_rows': 100}, True, True),
+    'reserves-1000': ({'reserve_rows': 1000}, True, True),
+    'text-5k': ({'text_chars': 5000}, True, True),
+    'text-50k': ({'text_chars': 50000}, True, True),
+    'no-logo': ({}, False, True),
+    'no-font': ({}, True, False),
+    'large': ({'lines': 500, 'reserve_rows': 1000, 'text_chars': 50000}, True, True),
+}
+QUICK_CASES = ('default', 'lines-50', 'reserves-100', 'text-5k', 'no-logo', 'no-font')
+
+
+class RenderSettings:
+    """Switches the logo and custom font on or off for the duration of a case."""
+
+    def __init__(self, logo_path):
+        self.logo_path = logo_path
+        self.original_logo_cache = report.logo_cache
+        self.original_font = report.FONT_NAME_NORMAL
+        self.no_logo_cache = LogoCache(os.path.join(os.path.dirname(logo_path), 'missing.png'),
+                                       width=2.0 * inch, height=1.0 * inch)
+        self.logo_cache = LogoCache(logo_path, width=2.0 * inch, height=1.0 * inch)
+
+    def apply(self, logo, font):
+        report.logo_cache = self.logo_cache if logo else self.no_logo_cache
+        report.FONT_NAME_NORMAL = self.original_font if font else 'Helvetica'
+
+    def restore(self):
+        report.logo_cache = self.original_logo_cache
+        report.FONT_NAME_NORMAL = self.original_font
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+
+    def pick(q):
+        index = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+        return ordered[index] * 1e3
+
+    return {'p50_ms': pick(0.50), 'p90_ms': pick(0.90), 'p99_ms': pick(0.99),
+            'min_ms': ordered[0] * 1e3, 'max_ms': ordered[-1] * 1e3}
+
+
+def clear_caches(pdf_cache=None):
+    layout_cache.clear_layout_cache()
+    if pdf_cache is not None:
+        pdf_cache.clear()
+
+
+def measure(fn, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def peak_allocation(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_render(data, iterations):
+    def render():
+        return report.generate_inspection_report_pdf(data).getvalue()
+
+    clear_caches()
+    start = time.perf_counter()
+    pdf = render()
+    cold_ms = (time.perf_counter() - start) * 1e3
+    result = percentiles(measure(render, iterations))
+    result['cold_ms'] = cold_ms
+    result['peak_alloc_kb'] = peak_allocation(render) / 1024
+    result['size_kb'] = len(pdf) / 1024
+    return result
+
+
+def bench_http(client, pdf_cache, data, iterations):
+    def post():
+        response = client.post('/generate_report', data=data)
+        assert response.status_code == 200, response.status_code
+        return response.data
+
+    def post_uncached():
+        pdf_cache.clear()
+        return post()
+
+    clear_caches(pdf_cache)
+    start = time.perf_counter()
+    pdf = post()
+    cold_ms = (time.perf_counter() - start) * 1e3
+    # "render": every request renders (PDF cache emptied first)
+    # "warm": identical resubmissions served from the PDF cache
+    render_result = percentiles(measure(post_uncached, iterations))
+    post()
+    warm_result = percentiles(measure(post, iterations))
+    return {
+        'render': dict(render_result, cold_ms=cold_ms, size_kb=len(pdf) / 1024,
+                       peak_alloc_kb=peak_allocation(post_uncached) / 1024),
+        'warm': dict(warm_result, peak_alloc_kb=peak_allocation(post) / 1024),
+    }
+
+
+def run(case_names, iterations, http):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        logo_path = os.path.join(tmp, 'logo.png')
+        PILImage.new('RGB', (1200, 600), (0, 86, 179)).save(logo_path)
+        settings = RenderSettings(logo_path)
+
+        client = pdf_cache = None
+        if http:
+            from app import create_app
+            web_app = create_app()
+            web_app.config['LOGIN_DISABLED'] = True
+            client = web_app.test_client()
+            pdf_cache = web_app.extensions['report_services'].pdf_cache
+
+        try:
+            for name in case_names:
+                kwargs, logo, font = CASES[name]
+                settings.apply(logo, font)
+                data = synthetic_report(**kwargs)
+                case_iterations = max(3, iterations // 10) if name in ('lines-500', 'reserves-1000', 'large') else iterations
+                results[f"render/{name}"] = bench_render(data, case_iterations)
+                print(format_row(f"render/{name}", results[f"render/{name}"]))
+                if http:
+                    http_results = bench_http(client, pdf_cache, data, case_iterations)
+                    for kind, result in http_results.items():
+                        results[f"http-{kind}/{name}"] = result
+                        print(format_row(f"http-{kind}/{name}", result))
+        finally:
+            settings.restore()
+    return results
+
+
+def format_row(name, result):
+    return (f"{name:<28} p50 {result['p50_ms']:8.2f} ms  p90 {result['p90_ms']:8.2f} ms  "
+            f"p99 {result['p99_ms']:8.2f} ms  peak {result['peak_alloc_kb']:9.0f} KB"
+            + (f"  size {result['size_kb']:7.1f} KB" if 'size_kb' in result else ''))
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+    for name, result in results.items():
+        base = baseline['results'].get(name)
+        if base is None:
+            continue
+        for metric in COMPARED_METRICS:
+            if metric not in result or not base.get(metric):
+                continue
+            change = (result[metric] - base[metric]) / base[metric]
+            if change > threshold:
+                regressions.append((name, metric, base[metric], result[metric], change))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--iterations', type=int, default=20, help='timed runs per case (default: 20)')
+    parser.add_argument('--cases', nargs='+', choices=sorted(CASES), help='cases to run (default: all)')
+    parser.add_argument('--quick', action='store_true', help='run a smaller set of cases')
+    parser.add_argument('--no-http', action='store_true', help='skip the Flask endpoint benchmarks')
+    parser.add_argument('--save-baseline', metavar='PATH', help='write results to a JSON baseline')
+    parser.add_argument('--compare', metavar='PATH', help='compare results against a JSON baseline')
+    parser.add_argument('--threshold', type=float, default=0.15,
+                        help='allowed relative regression before failing (default: 0.15)')
+    args = parser.parse_args(argv)
+
+    case_names = args.cases or (QUICK_CASES if args.quick else tuple(CASES))
+    results = run(case_names, args.iterations, http=not args.no_http)
+    document = {
+        'meta': {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'reportlab': reportlab.Version,
+            'platform': platform.platform(),
+            'iterations': args.iterations,
+        },
+        'results': results,
+    }
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(document, f, indent=2, sort_keys=True)
+        print(f"\nBaseline written to {args.save_baseline}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}:")
+            for name, metric, before, after, change in regressions:
+                print(f"  {name:<28} {metric:<14} {before:10.2f} -> {after:10.2f} (+{change:.0%})")
+            return 1
+        print(f"\nNo regressions over {args.threshold:.0%} against {args.compare}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
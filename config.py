@@ -5,4 +5,60 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'you-will-never-guess-this-secret-key-replace-me-in-production'
     # For a real application, consider using PostgreSQL or MySQL. SQLite is simple for demo.
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///site.db'
-    SQLALCHEMY_TRACK_MODIFICATIONS = False
\ No newline at end of file
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Upper bound on the total size of rendered PDFs kept for re-download (bytes)
+    PDF_CACHE_MAX_BYTES = int(os.environ.get('PDF_CACHE_MAX_BYTES') or 64 * 1024 * 1024)
+    # Batch report generation: worker processes, maximum rows per upload and how
+    # long one row may render before it is recorded as failed
+    BATCH_MAX_WORKERS = int(os.environ.get('BATCH_MAX_WORKERS') or os.cpu_count() or 2)
+    BATCH_MAX_ROWS = int(os.environ.get('BATCH_MAX_ROWS') or 1000)
+    BATCH_ROW_TIMEOUT_SECONDS = float(os.environ.get('BATCH_ROW_TIMEOUT_SECONDS') or 120.0)
+    # Asynchronous report jobs: the report POST queues a job and the client polls
+    # for the result. Off by default; small deployments render in the request.
+    REPORT_ASYNC_ENABLED = os.environ.get('REPORT_ASYNC_ENABLED', '').lower() in ('1', 'true', 'yes')
+    REPORT_JOB_DB = os.environ.get('REPORT_JOB_DB') or os.path.join('report_jobs', 'jobs.db')
+    REPORT_JOB_RESULTS_DIR = os.environ.get('REPORT_JOB_RESULTS_DIR') or os.path.join('report_jobs', 'results')
+    REPORT_JOB_WORKERS = int(os.environ.get('REPORT_JOB_WORKERS') or 2)
+    REPORT_JOB_MAX_QUEUE = int(os.environ.get('REPORT_JOB_MAX_QUEUE') or 100)
+    REPORT_JOB_TTL_SECONDS = int(os.environ.get('REPORT_JOB_TTL_SECONDS') or 3600)
+    # PDF output: 'memory' keeps each rendered PDF in a BytesIO; 'spooled' keeps it
+    # in memory only up to PDF_SPOOL_MAX_MEMORY bytes and serves larger ones from
+    # a temporary file (in PDF_SPOOL_DIR, default system temp dir)
+    PDF_OUTPUT_MODE = os.environ.get('PDF_OUTPUT_MODE') or 'memory'
+    PDF_SPOOL_MAX_MEMORY = int(os.environ.get('PDF_SPOOL_MAX_MEMORY') or 1024 * 1024)
+    PDF_SPOOL_DIR = os.environ.get('PDF_SPOOL_DIR') or None
+    # Per-phase report timing exposed on /metrics; reports slower than the
+    # threshold are logged with their phase breakdown (to SLOW_REPORT_LOG, or stdout)
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1').lower() in ('1', 'true', 'yes')
+    SLOW_REPORT_THRESHOLD_SECONDS = float(os.environ.get('SLOW_REPORT_THRESHOLD_SECONDS') or 5.0)
+    SLOW_REPORT_LOG = os.environ.get('SLOW_REPORT_LOG') or None
+    # Logged-in users are loaded from a cache instead of the database on every
+    # request. USER_CACHE_SHARED_DB (a local SQLite path) shares the cache between
+    # the web processes on a host; a TTL of 0 disables caching.
+    USER_CACHE_TTL_SECONDS = int(os.environ.get('USER_CACHE_TTL_SECONDS') or 60)
+    USER_CACHE_MAX_ENTRIES = int(os.environ.get('USER_CACHE_MAX_ENTRIES') or 10000)
+    USER_CACHE_SHARED_DB = os.environ.get('USER_CACHE_SHARED_DB') or None
+    # Load fonts, styles, the logo and templates and render one throwaway report
+    # when the app is created, so preforked workers (gunicorn --preload) share them
+    PREFORK_WARMUP = os.environ.get('PREFORK_WARMUP', '1').lower() in ('1', 'true', 'yes')
+    # Keep every rendered PDF and its form data for re-download from the report
+    # history (content-addressed files plus an SQLite index in REPORT_ARCHIVE_DIR)
+    REPORT_ARCHIVE_ENABLED = os.environ.get('REPORT_ARCHIVE_ENABLED', '').lower() in ('1', 'true', 'yes')
+    REPORT_ARCHIVE_DIR = os.environ.get('REPORT_ARCHIVE_DIR') or 'report_archive'
+    # Render admission control (per process): at most RENDER_MAX_CONCURRENT renders
+    # at once (0 disables the limit), at most RENDER_MAX_QUEUE waiting for up to
+    # RENDER_MAX_WAIT_SECONDS before a 503, and at most RENDER_MAX_PER_USER slots
+    # held by one user (default: half of the slots)
+    RENDER_MAX_CONCURRENT = int(os.environ.get('RENDER_MAX_CONCURRENT') or os.cpu_count() or 2)
+    RENDER_MAX_QUEUE = int(os.environ.get('RENDER_MAX_QUEUE') or 4 * RENDER_MAX_CONCURRENT)
+    RENDER_MAX_WAIT_SECONDS = float(os.environ.get('RENDER_MAX_WAIT_SECONDS') or 10.0)
+    RENDER_MAX_PER_USER = int(os.environ.get('RENDER_MAX_PER_USER') or max(1, RENDER_MAX_CONCURRENT // 2))
+    # Inspection photos uploaded with the report form: at most PHOTO_MAX_COUNT per
+    # report, PHOTO_MAX_BYTES each and PHOTO_MAX_TOTAL_BYTES per request (before
+    # processing). Processed photos are kept in PHOTO_STORE_DIR (see report.py).
+    PHOTO_MAX_COUNT = int(os.environ.get('PHOTO_MAX_COUNT') or 40)
+    PHOTO_MAX_BYTES = int(os.environ.get('PHOTO_MAX_BYTES') or 25 * 1024 * 1024)
+    PHOTO_MAX_TOTAL_BYTES = int(os.environ.get('PHOTO_MAX_TOTAL_BYTES') or 250 * 1024 * 1024)
+    # All text fields of one report form together (a pasted reserves list of
+    # ten thousand lines is about 500 KB); longer text is cut off with a message
+    REPORT_FORM_MAX_TEXT_BYTES = int(os.environ.get('REPORT_FORM_MAX_TEXT_BYTES') or 4 * 1024 * 1024)
\ No newline at end of file
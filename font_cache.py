@@ -0,0 +1,172 @@
+import base64
+import hashlib
+import json
+import mmap
+import os
+import stat
+from fnmatch import fnmatch
+from weakref import WeakKeyDictionary
+
+import reportlab
+from reportlab import rl_config
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont, TTFontFace, TTEncoding, TTFNameBytes, unShapedFontGlob
+
+# --- Parsed Font Cache ---
+# Constructing a TTFont parses the whole TrueType file (tables, cmap, glyph
+# metrics) in every process. The parsed face is written once per font file into
+# FONT_CACHE_DIR, keyed by the SHA-256 of the file and the ReportLab version,
+# and later processes load it instead of parsing. The raw font bytes that
+# subsetting reads are memory-mapped from the font file, so all workers share
+# one copy through the page cache. Any problem with the cache falls back to a
+# normal parse.
+#
+# The face is stored as JSON (plain data only, so a tampered file cannot run
+# code), in a directory that must belong to this user and be writable by no one
+# else; otherwise the cache is not used.
+
+# Bump if the stored layout changes
+FONT_CACHE_FORMAT = 2
+
+
+class _PdfScale:
+    """Picklable stand-in for the unitsPerEm -> 1000 scale lambda TTFontFile keeps."""
+
+    def __init__(self, units_per_em):
+        self.factor = 1000 / units_per_em
+
+    def __call__(self, value):
+        return value * self.factor
+
+
+def _map_file(path):
+    with open(path, 'rb') as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _cache_path(cache_dir, digest):
+    return os.path.join(cache_dir, f"{digest}-rl{reportlab.Version}-v{FONT_CACHE_FORMAT}.json")
+
+
+def _check_private(path):
+    # Owned by us and not writable by group or others, or the cache is not trusted
+    st = os.lstat(path)
+    if st.st_uid != os.getuid() or st.st_mode & (stat.S_IWGRP | stat.S_IWOTH) or stat.S_ISLNK(st.st_mode):
+        raise PermissionError(f"'{path}' must be owned by this user and not writable by others")
+
+
+def _prepare_cache_dir(cache_dir):
+    os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+    st = os.lstat(cache_dir)
+    if st.st_uid == os.getuid() and stat.S_ISDIR(st.st_mode) and st.st_mode & 0o077:
+        os.chmod(cache_dir, 0o700) # Ours, but from before the cache had to be private
+    _check_private(cache_dir)
+
+
+# JSON has no bytes, tuples or non-string keys, so those are tagged. The glyph
+# tables are large, so int-keyed dicts are stored as key and value columns, and
+# lists holding only JSON values are stored (and loaded) as they are.
+def _encode(value):
+    if isinstance(value, TTFNameBytes):
+        return {'__name__': value.ustr}
+    if isinstance(value, bytes):
+        return {'__bytes__': base64.b64encode(value).decode('ascii')}
+    if isinstance(value, tuple):
+        if all(isinstance(item, tuple) for item in value):
+            return {'__tuples__': [list(item) for item in value]}
+        return {'__tuple__': _encode(list(value))}
+    if isinstance(value, list):
+        if value and all(isinstance(item, tuple) for item in value):
+            return {'__tuples__': [_encode(list(item)) for item in value]}
+        items = [_encode(item) for item in value]
+        return {'__list__': items} if any(isinstance(item, dict) for item in items) else items
+    if isinstance(value, dict):
+        if all(isinstance(key, str) for key in value):
+            return {'__dict__': {key: _encode(item) for key, item in value.items()}}
+        return {'__keys__': _encode(list(value)), '__values__': _encode(list(value.values()))}
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    raise TypeError(f"cannot cache {type(value).__name__}")
+
+
+def _decode(value):
+    if not isinstance(value, dict):
+        return value # Scalars and plain lists
+    if '__keys__' in value:
+        return dict(zip(_decode(value['__keys__']), _decode(value['__values__'])))
+    (tag, item), = value.items()
+    if tag == '__name__':
+        return TTFNameBytes(item.encode('utf8'))
+    if tag == '__bytes__':
+        return base64.b64decode(item)
+    if tag == '__tuples__':
+        return [tuple(x) for x in item]
+    if tag == '__tuple__':
+        return tuple(_decode(item))
+    if tag == '__list__':
+        return [_decode(x) for x in item]
+    if tag == '__dict__':
+        return {key: _decode(x) for key, x in item.items()}
+    raise ValueError(f"unknown tag {tag!r}")
+
+
+def _font_from_face(name, face):
+    # Mirrors TTFont.__init__ with an already parsed face
+    font = TTFont.__new__(TTFont)
+    font.fontName = name
+    font.face = face
+    font.encoding = TTEncoding()
+    font.state = WeakKeyDictionary()
+    font._asciiReadable = rl_config.ttfAsciiReadable
+    font.shapable = not any(fnmatch(name, pattern) for pattern in unShapedFontGlob)
+    return font
+
+
+def _load_cached(name, path, font_data, cache_file):
+    _check_private(cache_file)
+    with open(cache_file, 'rb') as f:
+        state = _decode(json.load(f))
+    face = object.__new__(TTFontFace)
+    face.__dict__.update(state)
+    face._ttf_data = font_data
+    face.filename = path
+    face._pdfScale = _PdfScale(face.unitsPerEm)
+    return _font_from_face(name, face)
+
+
+def _write_cache(font, cache_file):
+    state = dict(font.face.__dict__)
+    del state['_ttf_data'] # Re-mapped from the font file on load
+    del state['_pdfScale'] # A local lambda; rebuilt from unitsPerEm
+    tmp_path = f"{cache_file}.{os.getpid()}.tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | os.O_EXCL, 0o600)
+    with os.fdopen(fd, 'w') as f:
+        json.dump(_encode(state), f, separators=(',', ':'))
+    os.replace(tmp_path, cache_file)
+
+
+def load_ttfont(name, path, cache_dir=None):
+    """Return a TTFont for path, using the parsed-font cache in cache_dir when given."""
+    if not cache_dir:
+        return TTFont(name, path)
+    try:
+        _prepare_cache_dir(cache_dir)
+        font_data = _map_file(path)
+        cache_file = _cache_path(cache_dir, hashlib.sha256(font_data).hexdigest())
+        if os.path.exists(cache_file):
+            return _load_cached(name, path, font_data, cache_file)
+    except Exception as e:
+        print(f"Font cache unavailable for '{path}': {e}. Parsing the font file.")
+        return TTFont(name, path)
+
+    font = TTFont(name, path)
+    try:
+        _write_cache(font, cache_file)
+    except Exception as e:
+        print(f"Could not write font cache for '{path}': {e}")
+    font.face._ttf_data = font_data # Same bytes, shared with the other workers
+    return font
+
+
+def register_ttfont(name, path, cache_dir=None):
+    pdfmetrics.registerFont(load_ttfont(name, path, cache_dir))
@@ -1,6 +1,7 @@
 from flask_wtf import FlaskForm
 from wtforms import StringField, PasswordField, SubmitField, BooleanField
-from wtforms.validators import DataRequired, Length, Email, EqualTo, ValidationError
+from wtforms.validators import DataRequired, Length, Email, EqualTo
+from sqlalchemy import or_
 from models import User
 
 class RegistrationForm(FlaskForm):
@@ -10,15 +11,20 @@ class RegistrationForm(FlaskForm):
     confirm_password = PasswordField('Confirm Password', validators=[DataRequired(), EqualTo('password')])
     submit = SubmitField('Sign Up')
 
-    def validate_username(self, username):
-        user = User.query.filter_by(username=username.data).first()
-        if user:
-            raise ValidationError('That username is taken. Please choose a different one.')
-
-    def validate_email(self, email):
-        user = User.query.filter_by(email=email.data).first()
-        if user:
-            raise ValidationError('That email is taken. Please choose a different one.')
+    def validate(self, extra_validators=None):
+        # One existence query covers both unique fields instead of one query each
+        valid = super().validate(extra_validators)
+        if not (self.username.data and self.email.data):
+            return valid
+        taken = User.query.with_entities(User.username, User.email).filter(
+            or_(User.username == self.username.data, User.email == self.email.data)).all()
+        if any(username == self.username.data for username, _ in taken):
+            self.username.errors.append('That username is taken. Please choose a different one.')
+            valid = False
+        if any(email == self.email.data for _, email in taken):
+            self.email.errors.append('That email is taken. Please choose a different one.')
+            valid = False
+        return valid
 
 class LoginForm(FlaskForm):
     email = StringField('Email', validators=[DataRequired(), Email()])
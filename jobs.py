@@ -0,0 +1,252 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from report import generate_inspection_report_pdf
+
+# --- Asynchronous Report Jobs ---
+# In async mode the report POST only records a job in a local SQLite table and
+# returns; a small pool of background worker threads renders queued jobs into
+# result files, and the client polls the job's status URL until it can download.
+# Claiming a job is a single IMMEDIATE transaction, so several web processes can
+# share the same job table and results directory.
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS report_jobs (
+    id TEXT PRIMARY KEY,
+    user_id INTEGER,
+    username TEXT,
+    status TEXT NOT NULL,
+    form_data TEXT NOT NULL,
+    download_name TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    expires_at REAL NOT NULL,
+    result_path TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_report_jobs_status_created ON report_jobs (status, created_at);
+CREATE INDEX IF NOT EXISTS ix_report_jobs_expires ON report_jobs (expires_at);
+"""
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class JobQueue:
+    def __init__(self, db_path, results_dir, workers=2, max_queue=100, ttl_seconds=3600,
+                 poll_interval=1.0, cleanup_interval=60.0, archive=None):
+        self.db_path = db_path
+        self.archive = archive # Optional ReportArchive that finished reports are also stored in
+        self.results_dir = results_dir
+        self.workers = workers
+        self.max_queue = max_queue
+        self.ttl_seconds = ttl_seconds
+        self.poll_interval = poll_interval
+        self.cleanup_interval = cleanup_interval
+        self._wakeup = threading.Condition()
+        self._started_pid = None
+        self._start_lock = threading.Lock()
+        self._stopping = False
+        self._threads = []
+        self._last_cleanup = 0.0
+
+        os.makedirs(results_dir, exist_ok=True)
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(_SCHEMA)
+            # Job tables created before usernames were recorded
+            columns = [row['name'] for row in conn.execute('PRAGMA table_info(report_jobs)')]
+            if 'username' not in columns:
+                conn.execute('ALTER TABLE report_jobs ADD COLUMN username TEXT')
+        finally:
+            conn.close()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    # --- Producer side (web requests) ---
+    def enqueue(self, form_data, user_id, download_name, username=None):
+        """Record a render job and return its id. Raises QueueFullError at max_queue."""
+        self.start()
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            depth = conn.execute(
+                'SELECT COUNT(*) FROM report_jobs WHERE status IN (?, ?)', (QUEUED, RUNNING)
+            ).fetchone()[0]
+            if depth >= self.max_queue:
+                conn.execute('ROLLBACK')
+                raise QueueFullError(f"{depth} reports are already waiting to be rendered.")
+            conn.execute(
+                'INSERT INTO report_jobs (id, user_id, username, status, form_data, download_name, created_at, '
+                'expires_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (job_id, user_id, username, QUEUED, json.dumps(form_data), download_name, now, now + self.ttl_seconds)
+            )
+            conn.execute('COMMIT')
+        finally:
+            conn.close()
+        with self._wakeup:
+            self._wakeup.notify()
+        return job_id
+
+    def get(self, job_id, user_id=None):
+        conn = self._connect()
+        try:
+            row = conn.execute('SELECT * FROM report_jobs WHERE id = ?', (job_id,)).fetchone()
+        finally:
+            conn.close()
+        if row is None or (user_id is not None and row['user_id'] != user_id):
+            return None
+        if row['expires_at'] < time.time():
+            return None
+        return dict(row)
+
+    def queue_depth(self):
+        conn = self._connect()
+        try:
+            return conn.execute(
+                'SELECT COUNT(*) FROM report_jobs WHERE status IN (?, ?)', (QUEUED, RUNNING)
+            ).fetchone()[0]
+        finally:
+            conn.close()
+
+    # --- Consumer side (background workers) ---
+    def start(self):
+        # Threads do not survive fork, so workers are started lazily in each
+        # process that actually uses the queue rather than at import time.
+        if self._started_pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._started_pid == os.getpid():
+                return
+            self._stopping = False
+            self._threads = []
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker_loop, name=f"report-job-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            self._started_pid = os.getpid()
+
+    def stop(self, timeout=None):
+        self._stopping = True
+        with self._wakeup:
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._started_pid = None
+
+    def _claim_next(self):
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute(
+                'SELECT id, user_id, username, form_data FROM report_jobs WHERE status = ? ORDER BY created_at LIMIT 1', (QUEUED,)
+            ).fetchone()
+            if row is None:
+                conn.execute('COMMIT')
+                return None
+            conn.execute('UPDATE report_jobs SET status = ?, started_at = ? WHERE id = ?',
+                         (RUNNING, time.time(), row['id']))
+            conn.execute('COMMIT')
+            return row['id'], json.loads(row['form_data']), row['user_id'], row['username']
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+    def _finish(self, job_id, status, result_path=None, error=None):
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute(
+                'UPDATE report_jobs SET status = ?, finished_at = ?, expires_at = ?, result_path = ?, error = ? '
+                'WHERE id = ?',
+                (status, now, now + self.ttl_seconds, result_path, error, job_id)
+            )
+        finally:
+            conn.close()
+
+    def _run_job(self, job_id, form_data, user_id, username):
+        result_path = os.path.join(self.results_dir, f"{job_id}.pdf")
+        tmp_path = result_path + '.tmp'
+        try:
+            pdf_buffer = generate_inspection_report_pdf(form_data)
+            with open(tmp_path, 'wb') as f:
+                f.write(pdf_buffer.getbuffer())
+            os.replace(tmp_path, result_path)
+        except Exception as e:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            print(f"Error rendering report job {job_id}: {e}")
+            self._finish(job_id, FAILED, error=str(e))
+            return
+        self._finish(job_id, DONE, result_path=result_path)
+        # Archiving problems must not cost the user their download
+        if self.archive is not None:
+            try:
+                self.archive.store(pdf_buffer.getbuffer(), form_data, user_id, username)
+            except Exception as e:
+                print(f"Error archiving report job {job_id}: {e}")
+
+    def _worker_loop(self):
+        while not self._stopping:
+            try:
+                if time.time() - self._last_cleanup >= self.cleanup_interval:
+                    self._last_cleanup = time.time()
+                    self.cleanup()
+                job = self._claim_next()
+            except sqlite3.Error as e:
+                print(f"Report job queue error: {e}")
+                job = None
+            if job is None:
+                with self._wakeup:
+                    self._wakeup.wait(self.poll_interval)
+                continue
+            try:
+                self._run_job(*job)
+            except sqlite3.Error as e:
+                # Recording the outcome failed (e.g. database locked past the busy
+                # timeout); the job stays running until cleanup, the worker lives on
+                print(f"Report job queue error finishing job {job[0]}: {e}")
+
+    def cleanup(self):
+        """Delete expired jobs and their result files. Returns the number removed."""
+        now = time.time()
+        conn = self._connect()
+        try:
+            # Running jobs are left alone unless they have been running for a whole
+            # TTL, which only happens when the process rendering them died.
+            expired = conn.execute(
+                'SELECT id, result_path FROM report_jobs WHERE expires_at < ? AND (status != ? OR started_at < ?)',
+                (now, RUNNING, now - self.ttl_seconds)
+            ).fetchall()
+            for row in expired:
+                if row['result_path']:
+                    try:
+                        os.remove(row['result_path'])
+                    except FileNotFoundError:
+                        pass
+                conn.execute('DELETE FROM report_jobs WHERE id = ?', (row['id'],))
+        finally:
+            conn.close()
+        return len(expired)
@@ -0,0 +1,111 @@
+import threading
+from collections import OrderedDict
+
+from reportlab.platypus import Paragraph
+from reportlab.platypus.paragraph import ParaParser, cleanBlockQuotedText, textTransformFrags
+
+# --- Paragraph Layout Cache ---
+# Most reports repeat the same boilerplate paragraphs: the disclaimer, the
+# section headings and the details-table labels. ReportLab re-parses the markup
+# of every Paragraph and re-breaks its lines on every build. CachedParagraph
+# shares the parsed fragments per (text, style, bullet) and the broken lines per
+# (text, style, bullet, available width) across reports, in bounded LRUs.
+# Cached layouts are only read during drawing, so output is byte-identical.
+
+LAYOUT_CACHE_MAX_ENTRIES = 1024
+
+
+class _LRU:
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'entries': len(self._entries), 'max_entries': self.max_entries}
+
+
+_parsed = _LRU(LAYOUT_CACHE_MAX_ENTRIES)
+_wrapped = _LRU(LAYOUT_CACHE_MAX_ENTRIES)
+
+
+class CachedParagraph(Paragraph):
+    """Paragraph whose parsed fragments and line breaks are shared across builds.
+
+    Only use it for text that recurs between reports; unique text just churns
+    the cache. The style must not be modified after first use (the registry
+    styles from styles.py never are).
+    """
+
+    def __init__(self, text, style, bulletText=None, frags=None):
+        bulletText = bulletText or getattr(style, 'bulletText', None)
+        # Paragraph.split() re-instantiates the class with text=None and explicit frags
+        self._layout_key = None if (frags is not None or text is None) else (text, style, bulletText)
+        if self._layout_key is None:
+            Paragraph.__init__(self, text, style, bulletText=bulletText, frags=frags)
+            return
+        self.caseSensitive = 1
+        self.encoding = 'utf8'
+        parsed = _parsed.get(self._layout_key)
+        if parsed is None:
+            cleaned = cleanBlockQuotedText(text)
+            parser = ParaParser()
+            parser.caseSensitive = self.caseSensitive
+            parsed_style, frags, bullet_frags = parser.parse(cleaned, style)
+            if frags is None:
+                raise ValueError("xml parser error (%s) in paragraph beginning\n'%s'"
+                                 % (parser.errors[0], cleaned[:min(30, len(cleaned))]))
+            textTransformFrags(frags, parsed_style)
+            parsed = (cleaned, parsed_style, frags, bullet_frags or bulletText)
+            _parsed.put(self._layout_key, parsed)
+        self.text, self.style, self.frags, self.bulletText = parsed
+        self.debug = 0
+
+    def wrap(self, availWidth, availHeight):
+        if self._layout_key is None:
+            return Paragraph.wrap(self, availWidth, availHeight)
+        key = (self._layout_key, availWidth)
+        wrapped = _wrapped.get(key)
+        if wrapped is None:
+            width, height = Paragraph.wrap(self, availWidth, availHeight)
+            if 'blPara' in self.__dict__: # Not set when the width is too small to lay out at all
+                _wrapped.put(key, (self._wrapWidths, self.blPara, width, height))
+            return width, height
+        self._wrapWidths, self.blPara, self.width, self.height = wrapped
+        return self.width, self.height
+
+
+def layout_cache_stats():
+    return {'parsed': _parsed.stats(), 'wrapped': _wrapped.stats()}
+
+
+def clear_layout_cache():
+    _parsed.clear()
+    _wrapped.clear()
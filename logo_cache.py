@@ -0,0 +1,101 @@
+import os
+import threading
+
+from PIL import Image as PILImage
+from reportlab.lib.utils import ImageReader
+from reportlab.platypus import Image
+
+# --- Decoded Logo Cache ---
+# The company logo almost never changes, so it is decoded (and downscaled to the
+# size it is printed at) once per process. Every request only pays for an
+# os.stat(); the file is re-read when its mtime or size changes. Load errors are
+# cached against the same signature so a broken file is not retried per request.
+
+LOGO_DPI = 300 # Print resolution the cached logo is downscaled to
+
+
+class LogoLoadError(Exception):
+    pass
+
+
+class CachedLogoImage(Image):
+    """Platypus Image drawing from an already decoded ImageReader."""
+
+    def __init__(self, reader, width, height, filename=None, hAlign='CENTER'):
+        self.hAlign = hAlign
+        self._mask = 'auto'
+        self._drawing = None
+        self._dpi = False
+        self._file = None
+        self.filename = filename or repr(reader)
+        self._img = reader
+        self._setup(width, height, 'direct', 0)
+
+
+class _LogoEntry:
+    __slots__ = ('signature', 'reader', 'error')
+
+    def __init__(self, signature, reader=None, error=None):
+        self.signature = signature
+        self.reader = reader
+        self.error = error
+
+
+class LogoCache:
+    def __init__(self, path, width, height, dpi=LOGO_DPI):
+        self.path = path
+        self.width = width
+        self.height = height
+        self.dpi = dpi
+        self._entry = None
+        self._lock = threading.Lock()
+
+    def signature(self):
+        """(mtime_ns, size) of the logo file, or None if it does not exist."""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _load(self, signature):
+        try:
+            with PILImage.open(self.path) as im:
+                im.load()
+                # Never upscale; only shrink to what the page can actually show
+                max_px = (max(1, int(self.width / 72.0 * self.dpi)),
+                          max(1, int(self.height / 72.0 * self.dpi)))
+                im = im.copy()
+                im.thumbnail(max_px, PILImage.LANCZOS)
+            reader = ImageReader(im)
+            # Decode eagerly so concurrent renders only ever read the cached data
+            reader.getSize()
+            reader.getRGBData()
+            if reader._dataA is not None:
+                reader._dataA.getRGBData()
+            return _LogoEntry(signature, reader=reader)
+        except Exception as e:
+            print(f"Error loading company logo: {e}")
+            return _LogoEntry(signature, error=e)
+
+    def get(self):
+        """Return a fresh logo flowable, or None when there is no logo file.
+
+        Raises LogoLoadError (cached until the file changes) if it cannot be decoded.
+        """
+        signature = self.signature()
+        if signature is None:
+            return None
+        entry = self._entry
+        if entry is None or entry.signature != signature:
+            with self._lock:
+                entry = self._entry
+                if entry is None or entry.signature != signature:
+                    entry = self._entry = self._load(signature)
+        if entry.error is not None:
+            raise LogoLoadError(entry.error)
+        return CachedLogoImage(entry.reader, self.width, self.height, filename=self.path)
+
+    def invalidate(self):
+        with self._lock:
+            self._entry = None
@@ -0,0 +1,229 @@
+import bisect
+import json
+import threading
+import time
+from datetime import datetime
+
+# --- Report Timing Metrics ---
+# Each report is timed phase by phase (form parsing, story assembly, doc.build,
+# header/footer callbacks, send_file) into fixed-bucket histograms labelled by
+# page count and PDF size ranges, exposed in the Prometheus text format. Reports
+# slower than a threshold are also written to a slow-report log with their
+# phase breakdown. When disabled, timers are shared no-op objects so the
+# instrumented code paths cost a couple of attribute lookups.
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Label values are ranges so the number of series stays bounded
+_PAGE_RANGES = ((1, '1'), (5, '2-5'), (20, '6-20'), (100, '21-100'))
+_SIZE_RANGES = ((100 * 1024, '<100KB'), (1024 * 1024, '100KB-1MB'), (10 * 1024 * 1024, '1MB-10MB'))
+
+
+def page_range(pages):
+    if pages is None:
+        return 'unknown'
+    for limit, label in _PAGE_RANGES:
+        if pages <= limit:
+            return label
+    return '>100'
+
+
+def size_range(size):
+    if size is None:
+        return 'unknown'
+    for limit, label in _SIZE_RANGES:
+        if size < limit:
+            return label
+    return '>10MB'
+
+
+class Histogram:
+    def __init__(self, name, help_text, label_names, buckets=SECONDS_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series = {} # label values -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((labels, list(series)) for labels, series in self._series.items())
+        for label_values, series in items:
+            labels = ','.join(f'{k}="{v}"' for k, v in zip(self.label_names, label_values))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series[:-1]):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{self.name}_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{labels}}} {series[-1]}")
+            lines.append(f"{self.name}_count{{{labels}}} {cumulative}")
+        return lines
+
+
+class _NullPhase:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _NullTimer:
+    """Stand-in used when metrics are disabled; every method is a no-op."""
+    __slots__ = ()
+    active = False
+    _phase = _NullPhase()
+
+    def phase(self, name):
+        return self._phase
+
+    def add(self, name, seconds):
+        pass
+
+    def set(self, **dimensions):
+        pass
+
+    def finish(self, **dimensions):
+        pass
+
+
+NULL_TIMER = _NullTimer()
+
+
+class _Phase:
+    __slots__ = ('timer', 'name', 'start')
+
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timer.add(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class ReportTimer:
+    active = True
+
+    def __init__(self, registry):
+        self.registry = registry
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.pages = None
+        self.size = None
+        self.claim_number = None
+
+    def phase(self, name):
+        return _Phase(self, name)
+
+    def add(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def set(self, pages=None, size=None, claim_number=None):
+        if pages is not None:
+            self.pages = pages
+        if size is not None:
+            self.size = size
+        if claim_number is not None:
+            self.claim_number = claim_number
+
+    def finish(self, **dimensions):
+        self.set(**dimensions)
+        self.registry._finish(self, time.perf_counter() - self.started)
+
+
+class MetricsRegistry:
+    def __init__(self, enabled=True, slow_threshold=None, slow_log_path=None):
+        self.enabled = enabled
+        self.slow_threshold = slow_threshold
+        self.slow_log_path = slow_log_path
+        self._local = threading.local()
+        self._slow_log_lock = threading.Lock()
+        self._collectors = []
+        self.phase_seconds = Histogram('report_phase_seconds', 'Time spent in each phase of report generation.',
+                                       ('phase', 'pages', 'size'))
+        self.report_seconds = Histogram('report_seconds', 'Total time to generate and send a report.',
+                                        ('pages', 'size'))
+
+    def configure(self, enabled=None, slow_threshold=None, slow_log_path=None):
+        if enabled is not None:
+            self.enabled = enabled
+        self.slow_threshold = slow_threshold
+        self.slow_log_path = slow_log_path
+
+    def begin_report(self):
+        """Start timing a report on this thread; returns NULL_TIMER when disabled."""
+        if not self.enabled:
+            return NULL_TIMER
+        timer = self._local.timer = ReportTimer(self)
+        return timer
+
+    def current_timer(self):
+        """The timer started on this thread by begin_report(), or NULL_TIMER."""
+        return getattr(self._local, 'timer', None) or NULL_TIMER
+
+    def discard(self, timer):
+        """Stop tracking timer on this thread without recording it (e.g. on errors)."""
+        if getattr(self._local, 'timer', None) is timer:
+            self._local.timer = None
+
+    def _finish(self, timer, total):
+        if getattr(self._local, 'timer', None) is timer:
+            self._local.timer = None
+        pages, size = page_range(timer.pages), size_range(timer.size)
+        for name, seconds in timer.phases.items():
+            self.phase_seconds.observe(seconds, name, pages, size)
+        self.report_seconds.observe(total, pages, size)
+        if self.slow_threshold is not None and total >= self.slow_threshold:
+            self._log_slow_report(timer, total)
+
+    def _log_slow_report(self, timer, total):
+        entry = json.dumps({
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'claim_number': timer.claim_number,
+            'total_seconds': round(total, 4),
+            'pages': timer.pages,
+            'size': timer.size,
+            'phases': {name: round(seconds, 4) for name, seconds in timer.phases.items()},
+        })
+        if self.slow_log_path:
+            with self._slow_log_lock:
+                with open(self.slow_log_path, 'a') as f:
+                    f.write(entry + '\n')
+        else:
+            print(f"Slow report: {entry}")
+
+    def register_collector(self, collector):
+        """Add a callable returning extra exposition lines for /metrics."""
+        self._collectors.append(collector)
+
+    def render_prometheus(self):
+        lines = self.phase_seconds.render() + self.report_seconds.render()
+        for collector in self._collectors:
+            lines.extend(collector())
+        return '\n'.join(lines) + '\n'
+
+
+def gauge_lines(name, help_text, value, metric_type='gauge'):
+    return [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}", f"{name} {value}"]
+
+
+# Process-wide registry used by the app and the render path
+registry = MetricsRegistry()
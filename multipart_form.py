@@ -0,0 +1,74 @@
+import tempfile
+from itertools import chain
+
+from werkzeug.datastructures import FileStorage, MultiDict
+from werkzeug.sansio.multipart import Data, Epilogue, Field, File, MultipartDecoder, NeedData
+
+# --- Report Form Parsing ---
+# The report form is multipart/form-data because of the photo uploads. Werkzeug
+# enforces its size limits (MAX_FORM_MEMORY_SIZE per text field, the request's
+# max_content_length) by aborting the whole parse with a 413, which throws away
+# every field the user typed. This parser reads the body once and never fails
+# over size: text beyond the text budget is cut off and uploads beyond the photo
+# budgets are discarded unread, each with a message, so the form can be shown
+# again with everything else intact.
+
+_CHUNK = 64 * 1024
+_SPOOL_MAX_MEMORY = 500 * 1024 # As Werkzeug: larger uploads spill to a temporary file
+
+
+def _megabytes(limit):
+    return f"{limit // (1024 * 1024)} MB"
+
+
+def parse_multipart_form(stream, boundary, max_text_bytes, max_file_bytes, max_total_file_bytes, max_parts=None):
+    """Return (form, files, problems) for a multipart/form-data body.
+
+    form and files are MultiDicts like request.form and request.files. problems
+    lists a message for each text field cut short (all text together is limited
+    to max_text_bytes) and each upload dropped for being larger than
+    max_file_bytes or taking the uploads past max_total_file_bytes.
+    """
+    decoder = MultipartDecoder(boundary, max_parts=max_parts)
+    form, files, problems = MultiDict(), MultiDict(), []
+    text_bytes = file_bytes = 0
+    part = container = None
+    for chunk in chain(iter(lambda: stream.read(_CHUNK), b''), [None]):
+        decoder.receive_data(chunk)
+        event = decoder.next_event()
+        while not isinstance(event, (Epilogue, NeedData)):
+            if isinstance(event, Field):
+                part, container, cut = event, [], False
+            elif isinstance(event, File):
+                part, size = event, 0
+                container = tempfile.SpooledTemporaryFile(max_size=_SPOOL_MAX_MEMORY)
+            elif isinstance(event, Data):
+                if isinstance(part, Field):
+                    data = event.data[:max(0, max_text_bytes - text_bytes)]
+                    if len(data) < len(event.data) and not cut:
+                        cut = True
+                        problems.append(f"'{part.name}' was cut short: the form's text is limited to "
+                                        f"{_megabytes(max_text_bytes)}.")
+                    container.append(data)
+                    text_bytes += len(data)
+                elif container is not None:
+                    size += len(event.data)
+                    if size > max_file_bytes or file_bytes + size > max_total_file_bytes:
+                        if size > max_file_bytes:
+                            problems.append(f"Photo '{part.filename}' is larger than {_megabytes(max_file_bytes)}.")
+                        else:
+                            problems.append(f"The photos are larger than {_megabytes(max_total_file_bytes)} in total; "
+                                            f"'{part.filename}' was not uploaded.")
+                        container.close()
+                        container = None # The rest of this upload is read and dropped
+                    else:
+                        container.write(event.data)
+                if not event.more_data:
+                    if isinstance(part, Field):
+                        form.add(part.name, b''.join(container).decode('utf-8', 'replace'))
+                    elif container is not None:
+                        container.seek(0)
+                        file_bytes += size
+                        files.add(part.name, FileStorage(container, part.filename, part.name, headers=part.headers))
+            event = decoder.next_event()
+    return form, files, problems
@@ -0,0 +1,86 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+# --- Content-Addressed PDF Cache ---
+# Adjusters regenerate the same report several times in a row. Rendered PDFs are
+# kept in an in-process LRU keyed by a hash of the normalized form data plus the
+# render configuration, and bounded by the total size of the cached PDFs rather
+# than by entry count. The key doubles as the response's ETag.
+
+
+def _normalize_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, str):
+        # Browsers submit textareas with CRLF line endings; treat them like LF
+        return value.replace('\r\n', '\n').replace('\r', '\n')
+    return value
+
+
+def report_cache_key(form_data, render_version):
+    """Return a stable hex digest for form_data rendered under render_version."""
+    normalized = {key: _normalize_value(value) for key, value in form_data.items()}
+    payload = json.dumps([render_version, normalized], sort_keys=True,
+                         separators=(',', ':'), ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class PDFCache:
+    def __init__(self, max_bytes, max_entry_bytes=None):
+        self.max_bytes = max_bytes
+        # A single huge report should not flush everything else out of the cache
+        self.max_entry_bytes = max_entry_bytes if max_entry_bytes is not None else max_bytes // 4
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.rejections = 0
+
+    def get(self, key):
+        with self._lock:
+            pdf = self._entries.get(key)
+            if pdf is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return pdf
+
+    def put(self, key, pdf):
+        size = len(pdf)
+        with self._lock:
+            if size > self.max_entry_bytes:
+                self.rejections += 1
+                return False
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._entries[key] = pdf
+            self._size += size
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+                self.evictions += 1
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'rejections': self.rejections,
+                'entries': len(self._entries),
+                'bytes': self._size,
+                'max_bytes': self.max_bytes,
+                'max_entry_bytes': self.max_entry_bytes,
+            }
@@ -0,0 +1,338 @@
+import hashlib
+import io
+import os
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image as PILImage, ImageOps
+from reportlab.pdfbase.pdfdoc import PDFImageXObject
+from reportlab.platypus import Flowable
+
+# --- Inspection Photo Store ---
+# Phone photos are 10+ megapixel JPEGs of several MB each; embedded as is they
+# make the PDF huge and every render re-reads them. Each upload is instead
+# decoded (at a reduced JPEG scale where possible), rotated per its EXIF
+# orientation, downscaled to the size it is printed at and re-encoded as a
+# baseline JPEG without metadata. PhotoFlowable copies that file into the PDF
+# as is, as a binary DCTDecode stream, so rendering a photo is just a file copy
+# (ReportLab's own Image would also ASCII85-encode it, which is both slow and
+# 25% larger).
+#
+# Processing runs in a thread pool (Pillow releases the GIL while decoding,
+# resizing and encoding), so photos are prepared while the rest of the report
+# is laid out; the report only waits when layout reaches a photo that is not
+# ready. Results are stored by the SHA-256 of the uploaded bytes, which is also
+# the photo's id in the form data, so re-rendering a report (from the form, a
+# job or the archive) reuses them and an identical upload is never processed
+# twice. Files are never rewritten. Uploads reach the pool as temporary files
+# in the store's incoming/ directory, never as bytes in memory.
+#
+# Disk use is bounded by max_bytes: a periodic cleanup (run in the pool) removes
+# the least recently used photos, by mtime, which every use refreshes. Photos
+# used within STORE_GRACE_SECONDS are never removed, so a render in progress in
+# any process keeps its files; a report re-rendered after its photos were
+# removed shows them as no longer available. The cleanup, also run at start-up,
+# sweeps uploads left in incoming/ by a process that died while processing.
+
+PHOTO_DPI = 300 # Print resolution photos are downscaled to
+PHOTO_MAX_WIDTH = 6.0 * 72 # Largest printed size, in points (two photos per page)
+PHOTO_MAX_HEIGHT = 4.0 * 72
+PHOTO_MIN_DPI = 100 # Small images are not blown up beyond this
+PHOTO_JPEG_QUALITY = 85
+PHOTO_MAX_PIXELS = 64 * 1000 * 1000 # Larger images are rejected before decoding
+PHOTO_FORMATS = ('JPEG', 'PNG', 'WEBP', 'TIFF', 'BMP', 'MPO')
+STORE_GRACE_SECONDS = 3600 # Recently used photos and uploads are never cleaned up
+CLEANUP_INTERVAL_SECONDS = 3600
+
+_PHOTO_ID = re.compile(r'^[0-9a-f]{64}$')
+_COPY_CHUNK = 1024 * 1024
+
+
+class PhotoError(Exception):
+    pass
+
+
+def parse_photo_ids(value, max_count=None):
+    """Photo ids from the form's whitespace separated 'photos' field; anything else is dropped."""
+    ids = []
+    for token in value.split():
+        if _PHOTO_ID.match(token) and token not in ids:
+            ids.append(token)
+    return ids[:max_count] if max_count is not None else ids
+
+
+def _target_pixels(dpi):
+    return (max(1, int(PHOTO_MAX_WIDTH / 72.0 * dpi)), max(1, int(PHOTO_MAX_HEIGHT / 72.0 * dpi)))
+
+
+def process_photo(source, dpi=PHOTO_DPI, quality=PHOTO_JPEG_QUALITY):
+    """Return the print-ready JPEG bytes for an uploaded image (a path or binary file)."""
+    max_px = _target_pixels(dpi)
+    with PILImage.open(source) as im:
+        # Let libjpeg decode at 1/2, 1/4 or 1/8 scale when that still covers the
+        # target; the longest side is used since EXIF rotation may swap the axes
+        longest = max(max_px)
+        im.draft('RGB', (longest, longest))
+        im = ImageOps.exif_transpose(im)
+        if im.mode in ('RGBA', 'LA', 'P'):
+            im = im.convert('RGBA')
+            background = PILImage.new('RGB', im.size, 'white')
+            background.paste(im, mask=im.getchannel('A'))
+            im = background
+        elif im.mode != 'RGB':
+            im = im.convert('RGB')
+        im.thumbnail(max_px, PILImage.LANCZOS, reducing_gap=3.0) # Never upscales
+        out = io.BytesIO()
+        im.save(out, 'JPEG', quality=quality, optimize=True)
+    return out.getvalue()
+
+
+class _JPEGXObject(PDFImageXObject):
+    # An RGB JPEG file embedded unchanged
+    def __init__(self, name, path, width, height):
+        self.name = name
+        self.width = width
+        self.height = height
+        self.bitsPerComponent = 8
+        self.colorSpace = 'DeviceRGB'
+        self._filters = ('DCTDecode',)
+        self.mask = None
+        with open(path, 'rb') as f:
+            self.streamContent = f.read()
+
+
+class PhotoFlowable(Flowable):
+    """A processed photo (see process_photo) drawn at width x height points."""
+
+    def __init__(self, photo_id, path, pixel_size, width, height):
+        Flowable.__init__(self)
+        self.photo_id = photo_id
+        self.path = path
+        self.pixel_size = pixel_size
+        self.width = width
+        self.height = height
+        self.hAlign = 'CENTER'
+
+    def wrap(self, availWidth, availHeight):
+        return self.width, self.height
+
+    def draw(self):
+        # The registration half of Canvas.drawImage, with our own XObject; one
+        # copy per document however often the photo appears
+        canv = self.canv
+        name = f"Photo{self.photo_id}"
+        reg_name = canv._doc.getXObjectName(name)
+        if canv._doc.idToObject.get(reg_name) is None:
+            xobject = _JPEGXObject(name, self.path, *self.pixel_size)
+            canv._setXObjects(xobject)
+            canv._doc.Reference(xobject, reg_name)
+            canv._doc.addForm(name, xobject)
+        canv._currentPageHasImages = 1
+        canv.saveState()
+        canv.scale(self.width, self.height)
+        canv._code.append(f"/{reg_name} Do")
+        canv.restoreState()
+        canv._formsinuse.append(name) # Lists the XObject in the page's /Resources
+
+
+class PhotoStore:
+    def __init__(self, root_dir, max_workers=None, max_bytes=None):
+        self.root_dir = root_dir
+        self.max_workers = max_workers or os.cpu_count() or 2
+        self.max_bytes = max_bytes # None: processed photos are kept for good
+        self._last_cleanup = 0.0
+        self._pending = {} # photo id -> Future, while processing and after a failure
+        self._lock = threading.Lock()
+        self._executor = None
+        self._executor_pid = None
+        self.processed = 0
+        self.reused = 0
+        self.removed = 0
+
+    def _get_executor(self):
+        # Threads do not survive fork, so each process starts its own pool
+        if self._executor is None or self._executor_pid != os.getpid():
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='photo')
+            self._executor_pid = os.getpid()
+            self._pending = {}
+        return self._executor
+
+    def path(self, photo_id):
+        return os.path.join(self.root_dir, photo_id[:2], f"{photo_id}.jpg")
+
+    def _incoming_dir(self):
+        return os.path.join(self.root_dir, 'incoming')
+
+    def _touch(self, path):
+        # Marks the photo as used for the least-recently-used cleanup
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _process(self, photo_id, upload_path):
+        try:
+            jpeg = process_photo(upload_path)
+        finally:
+            os.remove(upload_path)
+        path = self.path(photo_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(jpeg)
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        # Failed photos keep their future, so the render reports the actual error
+        with self._lock:
+            self._pending.pop(photo_id, None)
+
+    def _receive(self, stream):
+        # Copies an upload to a temporary file in the store, hashing it on the way
+        incoming_dir = self._incoming_dir()
+        os.makedirs(incoming_dir, exist_ok=True)
+        digest = hashlib.sha256()
+        fd, upload_path = tempfile.mkstemp(dir=incoming_dir, suffix='.upload')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in iter(lambda: stream.read(_COPY_CHUNK), b''):
+                    digest.update(chunk)
+                    f.write(chunk)
+        except BaseException:
+            os.remove(upload_path)
+            raise
+        return digest.hexdigest(), upload_path
+
+    def submit(self, stream):
+        """Queue an uploaded image (a binary file object) for processing and
+        return its photo id.
+
+        Only the header is decoded here; PhotoError is raised for files that are
+        not a supported image or are too large to decode.
+        """
+        photo_id, upload_path = self._receive(stream)
+        try:
+            try:
+                with PILImage.open(upload_path) as im:
+                    image_format, (width, height) = im.format, im.size
+            except Exception as e:
+                raise PhotoError(f"not a readable image ({e})") from None
+            if image_format not in PHOTO_FORMATS:
+                raise PhotoError(f"unsupported image format {image_format}")
+            if width * height > PHOTO_MAX_PIXELS:
+                raise PhotoError(f"{width}x{height} pixels is too large")
+
+            with self._lock:
+                executor = self._get_executor()
+                if photo_id in self._pending or os.path.exists(self.path(photo_id)):
+                    self.reused += 1
+                    self._touch(self.path(photo_id))
+                else:
+                    # _process removes the upload once it has been read
+                    self._pending[photo_id] = executor.submit(self._process, photo_id, upload_path)
+                    self.processed += 1
+                    upload_path = None
+        finally:
+            if upload_path is not None:
+                os.remove(upload_path)
+        self._maybe_cleanup()
+        return photo_id
+
+    def get(self, photo_id, timeout=None):
+        """Path of the processed JPEG, waiting if it is still being processed.
+
+        Raises PhotoError if processing failed or the photo is not in the store.
+        """
+        with self._lock:
+            future = self._pending.get(photo_id) if self._executor_pid == os.getpid() else None
+        if future is not None:
+            try:
+                future.result(timeout)
+            except Exception as e:
+                raise PhotoError(f"could not be processed ({e})") from None
+        path = self.path(photo_id)
+        if not os.path.exists(path):
+            raise PhotoError('is no longer available')
+        self._touch(path)
+        return path
+
+    def flowable(self, photo_id, max_width=PHOTO_MAX_WIDTH, max_height=PHOTO_MAX_HEIGHT):
+        """A PhotoFlowable of the photo, scaled to fit max_width x max_height points."""
+        path = self.get(photo_id)
+        with PILImage.open(path) as im:
+            width, height = im.size # Header only
+        scale = min(max_width / width, max_height / height, 72.0 / PHOTO_MIN_DPI)
+        return PhotoFlowable(photo_id, path, (width, height), width * scale, height * scale)
+
+    def _maybe_cleanup(self):
+        with self._lock:
+            if time.time() - self._last_cleanup < CLEANUP_INTERVAL_SECONDS:
+                return
+            self._last_cleanup = time.time()
+            self._get_executor().submit(self.cleanup)
+
+    def sweep_incoming(self):
+        """Remove uploads older than STORE_GRACE_SECONDS from incoming/ (left by a
+        process that died while processing them). Returns the number removed."""
+        removed = 0
+        cutoff = time.time() - STORE_GRACE_SECONDS
+        try:
+            entries = list(os.scandir(self._incoming_dir()))
+        except FileNotFoundError:
+            return 0
+        for entry in entries:
+            try:
+                if entry.name.endswith('.upload') and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    removed += 1
+            except FileNotFoundError: # Another process got there first
+                pass
+        return removed
+
+    def cleanup(self):
+        """Sweep incoming/ and, with max_bytes, remove least recently used photos
+        until the store fits. Returns the number of files removed."""
+        removed = self.sweep_incoming()
+        if self.max_bytes is None:
+            return removed
+        photos, total = [], 0
+        try:
+            shards = list(os.scandir(self.root_dir))
+        except FileNotFoundError:
+            return removed
+        for shard in shards:
+            if not shard.is_dir() or len(shard.name) != 2:
+                continue
+            for entry in os.scandir(shard.path):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                if entry.name.endswith('.jpg'):
+                    photos.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        cutoff = time.time() - STORE_GRACE_SECONDS
+        for mtime, size, path in sorted(photos):
+            if total <= self.max_bytes or mtime >= cutoff:
+                break
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+        with self._lock:
+            self.removed += removed
+        return removed
+
+    def stats(self):
+        with self._lock:
+            pending = sum(1 for future in self._pending.values() if not future.done())
+            return {'processed': self.processed, 'reused': self.reused, 'pending': pending, 'removed': self.removed}
@@ -0,0 +1,404 @@
+import os
+import io
+import tempfile
+from collections import namedtuple
+from datetime import datetime
+from xml.sax.saxutils import escape
+
+# Import reportlab components (your existing PDF logic)
+from reportlab.lib.pagesizes import letter
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak, Table, TableStyle
+from reportlab.lib.units import inch
+from reportlab.lib import colors
+from reportlab.platypus.flowables import KeepTogether
+from styles import get_report_styles # Shared report style registry
+from logo_cache import LogoCache, LogoLoadError # Decoded company-logo cache
+from layout_cache import CachedParagraph # Shared layout for recurring boilerplate paragraphs
+from metrics import registry as metrics # Per-phase report timing
+from reserves import ReserveTable, parse_reserve_lines, reserve_rows, GROUP, SUBTOTAL # Reserves parsing and high-volume table
+from font_cache import register_ttfont # Parsed-font cache
+from story import LazyStory, split_paragraphs # Lazily built story
+from photos import PhotoStore, PhotoError, parse_photo_ids # Processed inspection photos
+
+# The PDF rendering lives outside app.py so it can be imported (e.g. by batch
+# worker processes) without creating the Flask app or touching the database.
+
+# --- Configuration for PDF generation ---
+COMPANY_NAME = "Professional Inspection Services Inc."
+COMPANY_LOGO_PATH = "company_logo.png"
+CUSTOM_FONT_PATH = "Roboto-Regular.ttf"
+FONT_NAME_NORMAL = "Helvetica"
+FONT_NAME_BOLD = "Helvetica-Bold"
+FONT_NAME_CUSTOM = "Roboto"
+# Parsed TrueType fonts are cached here between process starts (created private
+# to this user, next to the Flask instance folder); empty disables it
+FONT_CACHE_DIR = os.environ.get('FONT_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                               'instance', 'font_cache'))
+
+# Bump whenever the report layout changes so cached PDFs/ETags are not reused
+RENDER_CONFIG_VERSION = 4
+
+# Reserves with at least this many table rows use the high-volume layout
+HIGH_VOLUME_RESERVE_ROWS = 200
+
+logo_cache = LogoCache(COMPANY_LOGO_PATH, width=2.0 * inch, height=1.0 * inch)
+draft_logo_cache = LogoCache(COMPANY_LOGO_PATH, width=2.0 * inch, height=1.0 * inch, dpi=72)
+
+# Uploaded photos, processed to print size and stored by content hash (see photos.py);
+# beyond PHOTO_STORE_MAX_BYTES the least recently used are removed
+PHOTO_STORE_DIR = os.environ.get('PHOTO_STORE_DIR') or 'report_photos'
+PHOTO_STORE_MAX_BYTES = int(os.environ.get('PHOTO_STORE_MAX_BYTES') or 5 * 1024 * 1024 * 1024)
+photo_store = PhotoStore(PHOTO_STORE_DIR, max_workers=int(os.environ.get('PHOTO_WORKERS') or 0) or None,
+                         max_bytes=PHOTO_STORE_MAX_BYTES)
+
+# --- Render Profiles ---
+# 'final' is the delivered report: compressed streams, the custom font embedded
+# as a subset of the glyphs used, the logo at print resolution (ReportLab embeds
+# each distinct image once). 'draft' is for quick previews while editing the
+# wording: no stream compression, the built-in Helvetica fonts (nothing to
+# embed), a screen-resolution logo, and it stops after the reserves section.
+# 'draft-full' is the same draft rendering of the whole report.
+RenderProfile = namedtuple('RenderProfile', 'name compress base14_fonts low_res_logo stop_after_reserves')
+
+RENDER_PROFILES = {
+    'final': RenderProfile('final', compress=True, base14_fonts=False, low_res_logo=False, stop_after_reserves=False),
+    'draft': RenderProfile('draft', compress=False, base14_fonts=True, low_res_logo=True, stop_after_reserves=True),
+    'draft-full': RenderProfile('draft-full', compress=False, base14_fonts=True, low_res_logo=True,
+                                stop_after_reserves=False),
+}
+DEFAULT_RENDER_PROFILE = 'final'
+
+
+def get_render_profile(profile=None):
+    """Look up a profile by name; a RenderProfile is returned as is, None means the default."""
+    if isinstance(profile, RenderProfile):
+        return profile
+    try:
+        return RENDER_PROFILES[profile or DEFAULT_RENDER_PROFILE]
+    except KeyError:
+        raise ValueError(f"Unknown render profile: {profile!r}") from None
+
+# --- Report fields and their defaults, as submitted by the report form ---
+REPORT_FIELDS = {
+    'report_title': 'Inspection Report',
+    'inspector_name': '',
+    'inspector_address': '',
+    'adjuster_name': '',
+    'adjuster_number': '',
+    'adjuster_email': '',
+    'report_date': '',
+    'claim_number': '',
+    'year_built': '',
+    'cause_of_loss_heading': 'Cause of Loss',
+    'cause_of_loss': '',
+    'resulting_damages_heading': 'Resulting Damages',
+    'resulting_damages': '',
+    'scope_of_work_heading': 'Scope of Work',
+    'scope_of_work': '',
+    'recommendations_heading': 'Recommendations',
+    'recommendations': '',
+    'reserves_heading': 'Estimated Reserves',
+    'reserves_input': '',
+    'disclaimer_heading': 'Disclaimer',
+    'disclaimer': '',
+    'photos_heading': 'Site Photos',
+    'photos': '', # Photo ids (see photos.py), one per line
+    'render_profile': DEFAULT_RENDER_PROFILE,
+}
+
+
+def build_form_data(source):
+    """Pick the report fields out of a request.form-like mapping, applying defaults."""
+    form_data = {}
+    for key, default in REPORT_FIELDS.items():
+        value = source.get(key, default)
+        form_data[key] = default if value is None else str(value)
+    if form_data['render_profile'] not in RENDER_PROFILES:
+        form_data['render_profile'] = DEFAULT_RENDER_PROFILE
+    form_data['photos'] = '\n'.join(parse_photo_ids(form_data['photos'])) # Ids are also file names
+    return form_data
+
+# --- Default report content, pre-filled into the form on GET ---
+def default_report_data():
+    # Current date in MDT (Calgary) format
+    current_date_mdt = datetime.now().strftime("%B %d, %Y")
+
+    return {
+        'report_title': "Property Inspection Report",
+        'inspector_name': "John Doe",
+        'inspector_address': "123 Inspection Lane, Suite 456, Calgary, AB T2Y 3X4",
+        'adjuster_name': "Jane Smith",
+        'adjuster_number': "555-123-4567",
+        'adjuster_email': "jane.smith@example.com",
+        'report_date': current_date_mdt,
+        'claim_number': "CLM-2025-06-001",
+        'year_built': "2005",
+        'cause_of_loss_heading': "Cause of Loss",
+        'cause_of_loss': "High winds caused a large tree branch to fall onto the roof, puncturing the shingles and underlying sheathing. The incident occurred during a severe thunderstorm.",
+        'resulting_damages_heading': "Resulting Damages",
+        'resulting_damages': "Significant damage to the roof structure, including compromised trusses and water infiltration into the attic space. Partial ceiling collapse in the master bedroom due to water saturation. Damage to drywall, insulation, and some personal belongings in the affected area. Minor water staining observed on walls in adjacent rooms.",
+        'scope_of_work_heading': "Scope of Work",
+        'scope_of_work': "1. Remove and dispose of damaged roofing materials and debris.\n2. Repair/replace compromised roof trusses and sheathing.\n3. Install new roofing underlayment and shingles (to match existing).\n4. Remove damaged ceiling and drywall in master bedroom.\n5. Dry affected areas and apply mold preventative.\n6. Replace insulation, drywall, and paint in affected areas.\n7. Clean and restore any salvageable personal belongings; document non-salvageable items.",
+        'recommendations_heading': "Recommendations",
+        'recommendations': "1. Recommend engaging a licensed roofing contractor for all roof repairs.\n2. Advise the homeowner to have a qualified electrician inspect wiring in the attic space due to potential water exposure.\n3. Suggest contacting an arborist to trim overhanging branches from other trees to prevent future incidents.",
+        'reserves_heading': "Estimated Reserves",
+        'reserves_input': "Roof Repair: 15000.00\nInterior Repair: 3500.00\nContents: 2000.00\nContingency: 2500.00",
+        'photos_heading': "Site Photos",
+        'photos': "",
+        'disclaimer_heading': "Disclaimer",
+        'disclaimer': (
+            "This inspection report is based on observations made at the time of the inspection and represents "
+            "the inspector's professional opinion. It is not an exhaustive list of all defects or conditions "
+            "and does not constitute a warranty or guarantee of any kind. Further investigation by specialists "
+            "may be required for certain findings. Estimated reserves are preliminary and subject to change based "
+            "on detailed assessments and actual repair costs. All parties should independently verify any information "
+            "contained herein and consult with appropriate professionals before making decisions."
+        )
+    }
+
+
+# --- Register custom font if available ---
+try:
+    if os.path.exists(CUSTOM_FONT_PATH):
+        register_ttfont(FONT_NAME_CUSTOM, CUSTOM_FONT_PATH, FONT_CACHE_DIR)
+        FONT_NAME_NORMAL = FONT_NAME_CUSTOM
+        print(f"Custom font '{CUSTOM_FONT_PATH}' registered successfully.")
+    else:
+        print(f"Warning: Custom font file '{CUSTOM_FONT_PATH}' not found. Using default fonts.")
+except Exception as e:
+    print(f"Error registering custom font: {e}. Using default fonts.")
+
+# --- Page Template Handler for Headers/Footers/Page Numbers ---
+def _header_footer(canvas, doc):
+    with metrics.current_timer().phase('header_footer'):
+        canvas.saveState()
+        styles = get_report_styles(*doc.report_fonts)
+        header_style = styles['Header']
+        footer_style = styles['Footer']
+
+        # Header
+        canvas.setFont(header_style.fontName, header_style.fontSize)
+        canvas.setFillColor(header_style.textColor)
+        canvas.drawString(inch, letter[1] - 0.75 * inch, f"{COMPANY_NAME} - Inspection Report")
+        canvas.drawString(letter[0] - 2 * inch, letter[1] - 0.75 * inch, doc.title)
+
+        # Footer
+        canvas.setFont(footer_style.fontName, footer_style.fontSize)
+        canvas.drawString(letter[0] / 2, 0.75 * inch, f"Page {doc.page}")
+        canvas.restoreState()
+
+
+def _profile_fonts(profile):
+    # (normal, bold) font names for a render profile
+    if profile.base14_fonts:
+        return 'Helvetica', 'Helvetica-Bold'
+    return FONT_NAME_NORMAL, FONT_NAME_BOLD
+
+
+def render_config_version():
+    # Everything besides form_data (which includes the render profile) that changes the bytes of the rendered PDF
+    return [RENDER_CONFIG_VERSION, FONT_NAME_NORMAL, FONT_NAME_BOLD, logo_cache.signature()]
+
+
+# --- PDF Output Targets ---
+def open_spooled_output(max_memory, spool_dir=None):
+    # Kept in memory up to max_memory bytes, spilled to an anonymous temp file beyond that
+    return tempfile.SpooledTemporaryFile(max_size=max_memory, mode='w+b', dir=spool_dir)
+
+
+def spooled_pdf_body(spool):
+    """Return (file object, size, in_memory) for a rendered spooled output.
+
+    The underlying file is returned rather than the spool itself: asking the
+    spool for fileno() (as sendfile-capable servers do) would force small,
+    in-memory outputs onto disk. A spilled output's file object is a real
+    temporary file that WSGI servers can hand to sendfile.
+    """
+    spool.seek(0, os.SEEK_END)
+    size = spool.tell()
+    spool.seek(0)
+    return spool._file, size, not spool._rolled
+
+
+# --- Reserves Table (typical claims with a handful of lines) ---
+def _reserve_table(rows):
+    # Same rows as the high-volume table (see reserves.reserve_rows), only laid
+    # out as one Table that sizes its rows to their content
+    reserve_data = [['Category', 'Amount']] + [cells for cells, kind in rows]
+    commands = [
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#E0E0E0')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
+        ('ALIGN', (0, 0), (0, -1), 'LEFT'),
+        ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+        ('FONTNAME', (0, 0), (-1, 0), FONT_NAME_BOLD),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
+        ('TOPPADDING', (0, 0), (-1, 0), 8),
+        ('BACKGROUND', (0, 1), (-1, -2), colors.white),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#CCCCCC')),
+        ('FONTNAME', (0, -1), (-1, -1), FONT_NAME_BOLD),
+        ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#F0F0F0')),
+        ('BOTTOMPADDING', (0, -1), (-1, -1), 8),
+        ('TOPPADDING', (0, -1), (-1, -1), 8),
+    ]
+    for index, (cells, kind) in enumerate(rows[:-1], start=1):
+        if kind in (GROUP, SUBTOTAL):
+            commands.append(('FONTNAME', (0, index), (-1, index), FONT_NAME_BOLD))
+        if kind == GROUP:
+            commands.append(('BACKGROUND', (0, index), (-1, index), colors.HexColor('#F0F0F0')))
+
+    reserve_table = Table(reserve_data, colWidths=[3.5 * inch, 2.0 * inch])
+    reserve_table.setStyle(TableStyle(commands))
+    return reserve_table
+
+
+# --- Story Assembly ---
+def _iter_story(data, profile):
+    # Yields the report's flowables section by section; doc.build() pulls them
+    # through a LazyStory as layout reaches them (see story.py)
+
+    # Shared styles, built once per font selection (see styles.py)
+    font_normal, font_bold = _profile_fonts(profile)
+    styles = get_report_styles(font_normal, font_bold)
+    style_title = styles['ReportTitle']
+    style_section_heading = styles['SectionHeading']
+    style_label = styles['Label']
+    style_body = styles['BodyText']
+    style_disclaimer = styles['DisclaimerText']
+
+    # --- Company Logo (if exists) ---
+    # Decoded once per process and reloaded only when the file changes (see logo_cache.py)
+    try:
+        logo = (draft_logo_cache if profile.low_res_logo else logo_cache).get()
+        if logo is not None:
+            logo.hAlign = 'CENTER' # <--- Logo Centered
+            yield logo
+            yield Spacer(1, 0.1 * inch)
+    except LogoLoadError as e:
+        yield Paragraph(f"<i>Error loading logo: {e}</i>", style_body)
+
+    # Headings, labels and the disclaimer recur across reports, so their parsed and
+    # wrapped layout is shared (see layout_cache.py); free text uses plain Paragraphs,
+    # one per blank-line separated paragraph so long narratives split cheaply.
+
+    # --- Report Title ---
+    yield CachedParagraph(data.get('report_title', 'Inspection Report'), style_title)
+    yield Spacer(1, 0.2 * inch)
+
+    # --- Inspection Details Table ---
+    details_data = [
+        [CachedParagraph("<b>Inspector:</b>", style_label), Paragraph(data.get('inspector_name', ''), style_body)],
+        [CachedParagraph("<b>Inspector Address:</b>", style_label), Paragraph(data.get('inspector_address', ''), style_body)],
+        [CachedParagraph("<b>Adjuster Name:</b>", style_label), Paragraph(data.get('adjuster_name', ''), style_body)],
+        [CachedParagraph("<b>Adjuster Number:</b>", style_label), Paragraph(data.get('adjuster_number', ''), style_body)],
+        [CachedParagraph("<b>Adjuster Email:</b>", style_label), Paragraph(data.get('adjuster_email', ''), style_body)],
+        [CachedParagraph("<b>Report Date:</b>", style_label), Paragraph(data.get('report_date', ''), style_body)],
+        [CachedParagraph("<b>Claim Number:</b>", style_label), Paragraph(data.get('claim_number', ''), style_body)],
+        [CachedParagraph("<b>Year Built:</b>", style_label), Paragraph(data.get('year_built', ''), style_body)],
+    ]
+    details_table = Table(details_data, colWidths=[1.7 * inch, 4.3 * inch])
+    details_table.setStyle(TableStyle([
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ('LEFTPADDING', (0, 0), (-1, -1), 0),
+        ('RIGHTPADDING', (0, 0), (-1, -1), 0),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
+    ]))
+    yield KeepTogether(details_table)
+    yield Spacer(1, 0.2 * inch)
+
+    # --- Cause of Loss ---
+    yield CachedParagraph(data.get('cause_of_loss_heading', 'Cause of Loss'), style_section_heading)
+    yield from split_paragraphs(data.get('cause_of_loss', ''), style_body)
+    yield Spacer(1, 0.2 * inch)
+
+    # --- Resulting Damages ---
+    yield CachedParagraph(data.get('resulting_damages_heading', 'Resulting Damages'), style_section_heading)
+    yield from split_paragraphs(data.get('resulting_damages', ''), style_body)
+    yield Spacer(1, 0.2 * inch)
+
+    # --- Scope of Work ---
+    yield CachedParagraph(data.get('scope_of_work_heading', 'Scope of Work'), style_section_heading)
+    for line in data.get('scope_of_work', '').split('\n'):
+        if line.strip():
+            yield Paragraph(line.strip(), style_body)
+    yield Spacer(1, 0.2 * inch)
+
+    # --- Recommendations ---
+    yield CachedParagraph(data.get('recommendations_heading', 'Recommendations'), style_section_heading)
+    for line in data.get('recommendations', '').split('\n'):
+        if line.strip():
+            yield Paragraph(line.strip(), style_body)
+    yield Spacer(1, 0.2 * inch)
+
+    # --- Reserves ---
+    yield CachedParagraph(data.get('reserves_heading', 'Estimated Reserves'), style_section_heading)
+    # Parsed the same way at any size; only the layout changes for thousands of
+    # line items (page-sized chunks, see reserves.py)
+    rows = reserve_rows(parse_reserve_lines(data.get('reserves_input', '')))
+    if len(rows) >= HIGH_VOLUME_RESERVE_ROWS:
+        yield ReserveTable(rows, font_normal, font_bold)
+    else:
+        yield _reserve_table(rows)
+    yield Spacer(1, 0.5 * inch)
+    if profile.stop_after_reserves:
+        return
+
+    # --- Site Photos ---
+    # Requested from the store only as layout reaches them, so photos still being
+    # processed in the background hold up nothing before this point
+    photo_ids = parse_photo_ids(data.get('photos', ''))
+    if photo_ids:
+        yield PageBreak()
+        yield CachedParagraph(data.get('photos_heading', 'Site Photos'), style_section_heading)
+        style_caption = styles['PhotoCaption']
+        for number, photo_id in enumerate(photo_ids, 1):
+            try:
+                photo = photo_store.flowable(photo_id)
+            except PhotoError as e:
+                yield Paragraph(f"<i>Photo {number} {escape(str(e))}.</i>", style_body)
+                continue
+            yield KeepTogether([photo, Paragraph(f"Photo {number}", style_caption)])
+
+    # --- Disclaimer ---
+    yield PageBreak()
+    yield CachedParagraph(data.get('disclaimer_heading', 'Disclaimer'), style_section_heading)
+    yield from split_paragraphs(data.get('disclaimer', ''), style_disclaimer, CachedParagraph)
+    yield Spacer(1, 0.5 * inch)
+
+
+# --- PDF Generation Function (same as previous revision) ---
+def generate_inspection_report_pdf(data, output=None, profile=None):
+    # Renders into output (any writable binary file) or a new BytesIO; returned rewound.
+    # profile is a RenderProfile or its name; by default data['render_profile'] is used.
+    profile = get_render_profile(profile or data.get('render_profile'))
+    buffer = output if output is not None else io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter,
+                            pageCompression=1 if profile.compress else 0,
+                            keywords=f"render-profile:{profile.name}") # Recorded in the PDF metadata
+    doc.report_fonts = _profile_fonts(profile) # For the header/footer callback
+
+    doc.title = f"Claim #{data.get('claim_number', 'N/A')}"
+
+    timer = metrics.current_timer()
+    owns_timer = not timer.active # Called outside a timed request (jobs, batch workers, benchmarks)
+    if owns_timer:
+        timer = metrics.begin_report()
+
+    try:
+        with timer.phase('story'):
+            story = LazyStory(_iter_story(data, profile))
+        with timer.phase('build'): # includes creating the flowables and the header_footer callbacks
+            doc.build(story, onFirstPage=_header_footer, onLaterPages=_header_footer)
+    except Exception:
+        if owns_timer:
+            metrics.discard(timer)
+        raise
+    buffer.seek(0)
+
+    if timer.active:
+        timer.set(pages=doc.page, claim_number=data.get('claim_number'))
+        if owns_timer:
+            buffer.seek(0, os.SEEK_END)
+            timer.finish(size=buffer.tell())
+            buffer.seek(0)
+    return buffer
@@ -0,0 +1,182 @@
+import re
+from collections import OrderedDict, namedtuple
+from decimal import Decimal, ROUND_HALF_UP
+
+from reportlab.lib import colors
+from reportlab.lib.units import inch
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.platypus import Flowable, Table, TableStyle
+
+# --- High-Volume Reserves Table ---
+# Large commercial claims paste thousands of "Category: Amount" lines. One big
+# Table makes ReportLab measure every cell and copy the remaining rows on every
+# page split, which grows quadratically. Here amounts are parsed exactly as
+# Decimals, optionally grouped ("Group: Category: Amount") with subtotals, and
+# laid out with fixed column widths and row heights: each page gets its own
+# Table holding exactly the rows that fit, with the header repeated, so layout
+# work is linear in the number of rows.
+
+COL_WIDTHS = (3.5 * inch, 2.0 * inch)
+HEADER_HEIGHT = 22
+ROW_HEIGHT = 15
+FONT_SIZE = 10
+CELL_PADDING = 6 # Table default left/right padding
+
+ITEM, GROUP, SUBTOTAL, TOTAL = 'item', 'group', 'subtotal', 'total'
+
+ReserveLine = namedtuple('ReserveLine', 'group category amount display')
+
+# Plain decimal numbers only: Decimal() also takes exponents, and formatting
+# '1e100000000' writes out every one of its digits
+_AMOUNT = re.compile(r'[+-]?(\d+\.?\d*|\.\d+)')
+AMOUNT_LIMIT = Decimal(10) ** 15 # Larger amounts are treated as invalid
+CENT = Decimal('0.01')
+
+
+def parse_amount(text):
+    """Parse '$12,345.67' style amounts exactly, to the cent; returns None if it
+    is not a number or is not below AMOUNT_LIMIT."""
+    cleaned = text.replace('$', '').replace(',', '').strip()
+    negative = cleaned.startswith('(') and cleaned.endswith(')')
+    if negative:
+        cleaned = cleaned[1:-1]
+    if not _AMOUNT.fullmatch(cleaned):
+        return None
+    amount = Decimal(cleaned)
+    if abs(amount) >= AMOUNT_LIMIT:
+        return None
+    amount = amount.quantize(CENT, rounding=ROUND_HALF_UP)
+    return -amount if negative else amount
+
+
+def format_amount(amount):
+    if amount < 0:
+        return f"-${-amount:,.2f}"
+    return f"${amount:,.2f}"
+
+
+def parse_reserve_lines(text):
+    """Yield a ReserveLine per non-blank line; amount is None if missing or invalid."""
+    for raw in text.split('\n'):
+        line = raw.strip()
+        if not line:
+            continue
+        if ':' not in line:
+            yield ReserveLine(None, line, None, 'N/A')
+            continue
+        head, amount_text = line.rsplit(':', 1)
+        group, sep, category = head.partition(':')
+        if not sep:
+            group, category = None, head
+        amount = parse_amount(amount_text)
+        display = format_amount(amount) if amount is not None else 'Invalid Amount (N/A)'
+        yield ReserveLine(group and group.strip(), category.strip(), amount, display)
+
+
+def reserve_rows(lines):
+    """Return ([category, amount] cells, row kind) pairs, including subtotals and the total."""
+    ungrouped = []
+    groups = OrderedDict()
+    for line in lines:
+        if line.group:
+            groups.setdefault(line.group, []).append(line)
+        else:
+            ungrouped.append(line)
+
+    rows = []
+    total = Decimal('0')
+
+    def add_items(items):
+        subtotal = Decimal('0')
+        for item in items:
+            rows.append(([item.category, item.display], ITEM))
+            if item.amount is not None:
+                subtotal += item.amount
+        return subtotal
+
+    total += add_items(ungrouped)
+    for group, items in groups.items():
+        rows.append(([group, ''], GROUP))
+        subtotal = add_items(items)
+        rows.append(([f"Subtotal: {group}", format_amount(subtotal)], SUBTOTAL))
+        total += subtotal
+    rows.append((['Total Estimated Reserves', format_amount(total)], TOTAL))
+    return rows
+
+
+def _fit_text(text, font_name, max_width):
+    # Fixed row heights mean no wrapping; long categories are cut to the column
+    if stringWidth(text, font_name, FONT_SIZE) <= max_width:
+        return text
+    while text and stringWidth(text + '...', font_name, FONT_SIZE) > max_width:
+        text = text[:max(0, min(len(text) - 1, int(len(text) * 0.9)))]
+    return text + '...'
+
+
+class ReserveTable(Flowable):
+    """Reserves table that splits into one fixed-layout Table per page."""
+
+    def __init__(self, rows, font_normal, font_bold, start=0):
+        Flowable.__init__(self)
+        self.rows = rows # Shared between all pieces of a split; never copied
+        self.font_normal = font_normal
+        self.font_bold = font_bold
+        self.start = start
+        self.hAlign = 'CENTER'
+
+    def _rows_height(self, count):
+        return HEADER_HEIGHT + count * ROW_HEIGHT
+
+    def wrap(self, availWidth, availHeight):
+        self.width = sum(COL_WIDTHS)
+        self.height = self._rows_height(len(self.rows) - self.start)
+        return self.width, self.height
+
+    def split(self, availWidth, availHeight):
+        fit = int((availHeight - HEADER_HEIGHT) // ROW_HEIGHT)
+        remaining = len(self.rows) - self.start
+        if fit < 1:
+            return []
+        if fit >= remaining:
+            return [self]
+        return [self.table(self.start, self.start + fit),
+                ReserveTable(self.rows, self.font_normal, self.font_bold, start=self.start + fit)]
+
+    def table(self, start, end):
+        """A Table for rows[start:end] with the header row."""
+        max_width = COL_WIDTHS[0] - 2 * CELL_PADDING
+        data = [['Category', 'Amount']]
+        commands = [
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#E0E0E0')),
+            ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
+            ('FONTNAME', (0, 0), (-1, -1), self.font_normal),
+            ('FONTSIZE', (0, 0), (-1, -1), FONT_SIZE),
+            ('FONTNAME', (0, 0), (-1, 0), self.font_bold),
+            ('ALIGN', (0, 0), (0, -1), 'LEFT'),
+            ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('TOPPADDING', (0, 0), (-1, -1), 0),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#CCCCCC')),
+        ]
+        for index, (cells, kind) in enumerate(self.rows[start:end], start=1):
+            font_name = self.font_normal if kind == ITEM else self.font_bold
+            data.append([_fit_text(cells[0], font_name, max_width), cells[1]])
+            if kind == ITEM:
+                continue
+            commands.append(('FONTNAME', (0, index), (-1, index), self.font_bold))
+            if kind in (GROUP, TOTAL):
+                commands.append(('BACKGROUND', (0, index), (-1, index), colors.HexColor('#F0F0F0')))
+        table = Table(data, colWidths=COL_WIDTHS,
+                      rowHeights=[HEADER_HEIGHT] + [ROW_HEIGHT] * (len(data) - 1))
+        table.setStyle(TableStyle(commands))
+        return table
+
+    def draw(self):
+        table = self.table(self.start, len(self.rows))
+        table.wrapOn(self.canv, self.width, self.height)
+        table.drawOn(self.canv, 0, 0)
+
+
+def build_reserve_table(text, font_normal, font_bold):
+    return ReserveTable(reserve_rows(parse_reserve_lines(text)), font_normal, font_bold)
@@ -0,0 +1,80 @@
+import re
+
+from reportlab.platypus import Paragraph
+
+# --- Lazy Story ---
+# doc.build() consumes its story from the front: it reads flowables[0], deletes
+# it, and puts the remainder of a split flowable back at the front. LazyStory
+# offers exactly those list operations over an iterator, pulling flowables
+# only as layout reaches them. A generator can then produce the report section
+# by section, so paragraphs are parsed just before they are laid out and
+# dropped once drawn, instead of the whole story existing before the build.
+
+_BLANK_LINES = re.compile(r'\n\s*\n')
+
+
+class LazyStory:
+    """List-like story for doc.build() that is filled from an iterable on demand."""
+
+    def __init__(self, flowables):
+        self._buffer = []
+        self._source = iter(flowables)
+
+    def _fill(self, count):
+        while self._source is not None and len(self._buffer) < count:
+            try:
+                self._buffer.append(next(self._source))
+            except StopIteration:
+                self._source = None
+
+    def __len__(self):
+        # Reports the buffered flowables only: enough for the emptiness checks,
+        # and a keepWithNext run is always buffered together with what follows
+        self._fill(1)
+        while self._buffer and self._buffer[-1].getKeepWithNext() and self._source is not None:
+            self._fill(len(self._buffer) + 1)
+        return len(self._buffer)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def _fill_for(self, index):
+        if isinstance(index, slice):
+            if index.stop is None or index.stop < 0:
+                self._fill(float('inf'))
+            else:
+                self._fill(index.stop)
+        elif index < 0:
+            self._fill(float('inf'))
+        else:
+            self._fill(index + 1)
+
+    def __getitem__(self, index):
+        self._fill_for(index)
+        return self._buffer[index]
+
+    def __setitem__(self, index, value):
+        self._fill_for(index)
+        self._buffer[index] = value
+
+    def __delitem__(self, index):
+        self._fill_for(index)
+        del self._buffer[index]
+
+    def insert(self, index, value):
+        self._buffer.insert(index, value)
+
+    def __iter__(self):
+        while self:
+            yield self._buffer.pop(0)
+
+
+def split_paragraphs(text, style, paragraph_class=Paragraph):
+    """Flowables for free text: one per blank-line separated paragraph.
+
+    Text without blank lines stays a single flowable of the unchanged text.
+    """
+    chunks = _BLANK_LINES.split(text.replace('\r\n', '\n'))
+    if len(chunks) <= 1:
+        return [paragraph_class(text, style)]
+    return [paragraph_class(chunk.strip(), style) for chunk in chunks if chunk.strip()]
@@ -0,0 +1,114 @@
+import threading
+from types import MappingProxyType
+
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_LEFT, TA_CENTER, TA_RIGHT
+
+# --- Report Style Registry ---
+# Building a sample style sheet plus the report's own ParagraphStyles is pure
+# allocation work, so it is done once per (normal font, bold font) pair and the
+# result is shared by every render and every page callback in the process.
+# Fonts can change at runtime (e.g. Roboto registration succeeds or fails), which
+# simply selects a different entry.
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def _build_styles(font_normal, font_bold):
+    styles = getSampleStyleSheet()
+    report_styles = {
+        'ReportTitle': ParagraphStyle(
+            'ReportTitle',
+            parent=styles['h1'],
+            fontName=font_bold,
+            fontSize=24,
+            textColor=colors.HexColor('#0056b3'),
+            alignment=TA_CENTER,
+            spaceAfter=0.3 * inch
+        ),
+        'SectionHeading': ParagraphStyle(
+            'SectionHeading',
+            parent=styles['h2'],
+            fontName=font_bold,
+            fontSize=16,
+            textColor=colors.HexColor('#004085'),
+            alignment=TA_LEFT,
+            spaceBefore=0.2 * inch,
+            spaceAfter=0.1 * inch,
+        ),
+        'Label': ParagraphStyle(
+            'Label',
+            parent=styles['Normal'],
+            fontName=font_bold,
+            fontSize=10,
+            textColor=colors.black,
+            spaceAfter=0.05 * inch
+        ),
+        'BodyText': ParagraphStyle(
+            'BodyText',
+            parent=styles['Normal'],
+            fontName=font_normal,
+            fontSize=10,
+            textColor=colors.black,
+            alignment=TA_LEFT,
+            leading=12
+        ),
+        'DisclaimerText': ParagraphStyle(
+            'DisclaimerText',
+            parent=styles['Normal'],
+            fontName=font_normal,
+            fontSize=8,
+            textColor=colors.HexColor('#555555'),
+            alignment=TA_CENTER,
+            spaceBefore=0.2 * inch
+        ),
+        'PhotoCaption': ParagraphStyle(
+            'PhotoCaption',
+            parent=styles['Normal'],
+            fontName=font_normal,
+            fontSize=9,
+            textColor=colors.HexColor('#333333'),
+            alignment=TA_CENTER,
+            spaceBefore=4,
+            spaceAfter=0.2 * inch
+        ),
+        # Used by the page callback for the running header and footer
+        'Header': ParagraphStyle(
+            'Header',
+            parent=styles['Normal'],
+            fontName=font_normal,
+            fontSize=9,
+            textColor=colors.HexColor('#333333'),
+            alignment=TA_RIGHT,
+            spaceAfter=0
+        ),
+        'Footer': ParagraphStyle(
+            'Footer',
+            parent=styles['Normal'],
+            fontName=font_normal,
+            fontSize=9,
+            textColor=colors.HexColor('#333333'),
+            alignment=TA_CENTER,
+            spaceBefore=0
+        ),
+    }
+    return MappingProxyType(report_styles)
+
+
+def get_report_styles(font_normal, font_bold):
+    """Return the shared, read-only style mapping for the given fonts.
+
+    The ParagraphStyle objects are shared between threads and must not be
+    modified; derive a new ParagraphStyle from one if a variant is needed.
+    """
+    key = (font_normal, font_bold)
+    styles = _registry.get(key)
+    if styles is None:
+        with _registry_lock:
+            styles = _registry.get(key)
+            if styles is None:
+                styles = _registry[key] = _build_styles(font_normal, font_bold)
+    return styles
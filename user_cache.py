@@ -0,0 +1,190 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from flask_login import UserMixin
+
+# --- Session User Cache ---
+# Flask-Login calls the user loader on every request from a logged-in user,
+# which costs a database round trip before any real work starts. The loader
+# caches a small read-only snapshot of the user (id, username, email) for a
+# TTL in a bounded, thread-safe LRU. With a shared store path configured the
+# snapshots live in a local SQLite file instead, so every web process on the
+# host sees the same entries and invalidations. Snapshots never hold the
+# password hash and are not ORM instances, so they cannot be flushed back.
+
+
+class SessionUser(UserMixin):
+    """Read-only stand-in for models.User used as current_user."""
+
+    def __init__(self, id, username, email):
+        self.id = id
+        self.username = username
+        self.email = email
+
+    def get_id(self):
+        return str(self.id)
+
+    def as_dict(self):
+        return {'id': self.id, 'username': self.username, 'email': self.email}
+
+    def __repr__(self):
+        return f"SessionUser('{self.username}', '{self.email}')"
+
+
+class _LocalStore:
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict() # user id -> (expires_at, snapshot dict)
+        self._lock = threading.Lock()
+
+    def get(self, user_id, now):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            if entry[0] <= now:
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return entry[1]
+
+    def put(self, user_id, snapshot, expires_at):
+        with self._lock:
+            self._entries[user_id] = (expires_at, snapshot)
+            self._entries.move_to_end(user_id)
+            evicted = 0
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+            return evicted
+
+    def delete(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class _SharedStore:
+    """Same interface as _LocalStore, backed by a SQLite file shared between processes."""
+
+    def __init__(self, path, max_entries):
+        self.path = path
+        self.max_entries = max_entries
+        db_dir = os.path.dirname(path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS session_users '
+                         '(user_id INTEGER PRIMARY KEY, expires_at REAL NOT NULL, data TEXT NOT NULL)')
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_session_users_expires ON session_users (expires_at)')
+        finally:
+            conn.close()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5, isolation_level=None)
+
+    def get(self, user_id, now):
+        conn = self._connect()
+        try:
+            row = conn.execute('SELECT data FROM session_users WHERE user_id = ? AND expires_at > ?',
+                               (user_id, now)).fetchone()
+        finally:
+            conn.close()
+        return json.loads(row[0]) if row else None
+
+    def put(self, user_id, snapshot, expires_at):
+        conn = self._connect()
+        try:
+            conn.execute('INSERT OR REPLACE INTO session_users (user_id, expires_at, data) VALUES (?, ?, ?)',
+                         (user_id, expires_at, json.dumps(snapshot)))
+            # Expired rows go first, then the entries closest to expiry
+            evicted = conn.execute('DELETE FROM session_users WHERE expires_at <= ?', (time.time(),)).rowcount
+            evicted += conn.execute(
+                'DELETE FROM session_users WHERE user_id IN (SELECT user_id FROM session_users '
+                'ORDER BY expires_at DESC LIMIT -1 OFFSET ?)', (self.max_entries,)
+            ).rowcount
+        finally:
+            conn.close()
+        return evicted
+
+    def delete(self, user_id):
+        conn = self._connect()
+        try:
+            conn.execute('DELETE FROM session_users WHERE user_id = ?', (user_id,))
+        finally:
+            conn.close()
+
+    def clear(self):
+        conn = self._connect()
+        try:
+            conn.execute('DELETE FROM session_users')
+        finally:
+            conn.close()
+
+    def __len__(self):
+        conn = self._connect()
+        try:
+            return conn.execute('SELECT COUNT(*) FROM session_users').fetchone()[0]
+        finally:
+            conn.close()
+
+
+class UserCache:
+    def __init__(self, ttl_seconds=60, max_entries=10000, shared_path=None):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._store = _SharedStore(shared_path, max_entries) if shared_path else _LocalStore(max_entries)
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def load(self, user_id, fetch):
+        """Return a SessionUser for user_id, calling fetch(user_id) -> User or None on a miss."""
+        now = time.time()
+        snapshot = self._store.get(user_id, now) if self.ttl_seconds > 0 else None
+        if snapshot is not None:
+            with self._stats_lock:
+                self.hits += 1
+            return SessionUser(**snapshot)
+        with self._stats_lock:
+            self.misses += 1
+        user = fetch(user_id)
+        if user is None:
+            return None # Unknown ids are not cached; the session is logged out anyway
+        session_user = SessionUser(user.id, user.username, user.email)
+        if self.ttl_seconds > 0:
+            evicted = self._store.put(user_id, session_user.as_dict(), now + self.ttl_seconds)
+            if evicted:
+                with self._stats_lock:
+                    self.evictions += evicted
+        return session_user
+
+    def invalidate(self, user_id):
+        self._store.delete(user_id)
+        with self._stats_lock:
+            self.invalidations += 1
+
+    def clear(self):
+        self._store.clear()
+
+    def stats(self):
+        with self._stats_lock:
+            stats = {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                     'invalidations': self.invalidations}
+        stats.update(entries=len(self._store), max_entries=self.max_entries, ttl_seconds=self.ttl_seconds,
+                     shared=isinstance(self._store, _SharedStore))
+        return stats
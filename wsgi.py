@@ -0,0 +1,5 @@
+from app import create_app
+
+# WSGI entry point, e.g. gunicorn --preload wsgi:app. Importing app.py alone
+# creates nothing; the app (database, caches, warmup) is built here.
+app = create_app()